@@ -3,6 +3,8 @@ import dotenv
 import streamlit as st
 import os
 
+import instrumentation
+
 # ページ設定
 st.set_page_config(
     page_title="DD Learn Apps",
@@ -11,6 +13,11 @@ st.set_page_config(
 )
 
 def main():
+    dotenv.load_dotenv()
+    # INSTRUMENTATION=1 で処理時間の計測を有効にする（DEBUG_PANEL=1 でサイドバーにも表示）
+    if os.getenv("INSTRUMENTATION") == "1":
+        instrumentation.enable(show_panel=os.getenv("DEBUG_PANEL") == "1")
+
     base_dir = os.path.dirname(__file__) or '.'
     app_dir = os.path.join(base_dir, 'apps')
     home = st.Page(page=home_page, title="home", url_path="home", default=True)
@@ -28,7 +35,8 @@ def main():
             st.error(f"ファイルが見つかりません: {app_path}")
 
     pg = st.navigation(navigation_list, position="hidden")
-    pg.run()
+    with instrumentation.rerun_scope(pg.url_path or "home"):
+        pg.run()
 
 def home_page():
     dotenv.load_dotenv()
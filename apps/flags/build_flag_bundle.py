@@ -0,0 +1,43 @@
+import argparse
+from pathlib import Path
+from typing import Iterable, List, Optional, Tuple
+
+from download_flags import DEFAULT_SIZES, load_country_codes
+from flag_bundle import bundle_path, write_bundle
+from flag_store import DEFAULT_FLAGS_DIR, flag_path
+
+
+def build_bundle(flags_dir: Path, size: str, codes: Iterable[str]) -> Tuple[Path, int, List[str]]:
+    """download_flags.py で保存した画像を1つのバンドルにまとめる
+
+    (バンドルのパス, まとめた画像の数, 画像がなかった国コード) を返す。
+    """
+    images = {}
+    missing = []
+    for code in codes:
+        try:
+            images[code.lower()] = flag_path(flags_dir, code, size).read_bytes()
+        except OSError:
+            missing.append(code)
+    path = bundle_path(flags_dir, size)
+    write_bundle(path, images)
+    return path, len(images), missing
+
+
+def main(argv: Optional[List[str]] = None):
+    """メイン処理"""
+    parser = argparse.ArgumentParser(description="国旗画像をサイズごとに1つのバンドルファイルにまとめる")
+    parser.add_argument("--flags-dir", default=DEFAULT_FLAGS_DIR, help="国旗画像のフォルダ")
+    parser.add_argument("--sizes", default=",".join(DEFAULT_SIZES), help="画像サイズ（カンマ区切り）")
+    args = parser.parse_args(argv)
+
+    codes = load_country_codes()
+    for size in args.sizes.split(","):
+        path, count, missing = build_bundle(Path(args.flags_dir), size, codes)
+        print(f"{path}: {count}/{len(codes)} 件（{path.stat().st_size:,} バイト）")
+        if missing:
+            print(f"  画像がない国コード: {', '.join(missing)}")
+
+
+if __name__ == "__main__":
+    main()
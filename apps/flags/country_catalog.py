@@ -0,0 +1,79 @@
+import json
+import random
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from types import MappingProxyType
+from typing import Iterable, List, Mapping, Optional, Tuple
+
+# countries.json の場所（スクリプトと同じフォルダ）
+COUNTRIES_PATH = Path(__file__).resolve().parent / "countries.json"
+
+
+@dataclass(frozen=True)
+class Country:
+    """国のデータ（国名・画像ファイル名・ISO 3166-1 alpha-2 の国コード）"""
+    name: str
+    flag: str
+    code: str = ""
+
+
+class CountryCatalog:
+    """国の一覧（変更不可）
+
+    プロセス内で一度だけ作成して全セッションで共有する。
+    国名・国コードからの索引と国名の配列を作成時に用意しておくため、
+    選択肢の抽出は国の数によらず選ぶ数 k に比例する時間で済む。
+    """
+
+    def __init__(self, countries: Iterable[Country]):
+        self.countries: Tuple[Country, ...] = tuple(countries)
+        self.names: Tuple[str, ...] = tuple(country.name for country in self.countries)
+        self._index_by_name: Mapping[str, int] = MappingProxyType(
+            {name: i for i, name in enumerate(self.names)})
+        self.by_name: Mapping[str, Country] = MappingProxyType(
+            {country.name: country for country in self.countries})
+        self.by_code: Mapping[str, Country] = MappingProxyType(
+            {country.code.upper(): country for country in self.countries if country.code})
+
+    @classmethod
+    def from_json(cls, path: Path = COUNTRIES_PATH) -> "CountryCatalog":
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        return cls(Country(item['name'], item.get('flag', ""), item.get('code', "")) for item in data)
+
+    def __len__(self) -> int:
+        return len(self.countries)
+
+    def sample(self, count: int, rng: Optional[random.Random] = None) -> List[Country]:
+        """重複なしで count か国を選ぶ"""
+        return (rng or random).sample(self.countries, count)
+
+    def sample_options(self, correct_name: str, num_options: int = 4,
+                       rng: Optional[random.Random] = None) -> List[str]:
+        """正解を含む num_options 個の選択肢（正解以外は重複なしでランダム）"""
+        rng = rng or random
+        correct = self._index_by_name[correct_name]
+        # 正解を除いた n-1 個の番号から選び、正解以降の番号を1つずらす
+        picks = rng.sample(range(len(self.names) - 1), num_options - 1)
+        options = [self.names[i + (i >= correct)] for i in picks]
+        options.append(correct_name)
+        rng.shuffle(options)
+        return options
+
+
+_catalog: Optional[CountryCatalog] = None
+_catalog_lock = threading.Lock()
+
+
+def get_catalog() -> CountryCatalog:
+    """プロセス内で共有する国の一覧（初回だけ countries.json を読み込む）
+
+    読み込みに失敗した場合は例外をそのまま送出し、次の呼び出しで再度読み込む。
+    """
+    global _catalog
+    if _catalog is None:
+        with _catalog_lock:
+            if _catalog is None:
+                _catalog = CountryCatalog.from_json()
+    return _catalog
@@ -1,239 +1,210 @@
-import requests
+import argparse
 import json
-import os
-from pathlib import Path
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
 
-def download_flag_image(country_code, filename, size="w320"):
-    """
-    flagcdn.com APIを使用して国旗画像をダウンロード
-    size: w20, w40, w80, w160, w320, w640, w1280, w2560
-    """
-    url = f"https://flagcdn.com/{size}/{country_code.lower()}.png"
-    
-    try:
-        response = requests.get(url, timeout=10)
-        response.raise_for_status()
-        
-        # data/flags フォルダに保存
-        flag_path = Path("data/flags") / filename
-        flag_path.parent.mkdir(parents=True, exist_ok=True)
-        
-        with open(flag_path, 'wb') as f:
-            f.write(response.content)
-        
-        print(f"Downloaded: {filename}")
-        return True
-    except Exception as e:
-        print(f"Failed to download {filename}: {e}")
-        return False
-
-def get_country_codes():
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from flag_store import DEFAULT_FLAGS_DIR, FLAG_CDN_URL, flag_path
+
+# スクリプトのディレクトリ（countries.json の基準）
+SCRIPT_DIR = Path(__file__).resolve().parent
+
+# 1回で取得するサイズ（flagcdn.com: w20, w40, w80, w160, w320, w640, w1280, w2560）
+DEFAULT_SIZES = ("w80", "w320", "w640")
+DEFAULT_WORKERS = 8
+DEFAULT_RATE = 10.0  # 1秒あたりのリクエスト数
+REQUEST_TIMEOUT = 10  # 秒
+
+# ダウンロード済みファイルの記録（中断しても続きから再開できる）
+MANIFEST_NAME = "manifest.json"
+
+# ダウンロード結果
+DOWNLOADED = "downloaded"
+UNCHANGED = "unchanged"
+SKIPPED = "skipped"
+FAILED = "failed"
+
+
+class TokenBucket:
+    """トークンバケット方式のレート制限（スレッドセーフ）
+
+    rate 個/秒でトークンが貯まり、最大 capacity 個まで連続してリクエストできる。
     """
-    ISO 3166-1 alpha-2 国コードマッピング
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(rate, 1.0)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """トークンを1つ取り出す（なければ貯まるまで待つ）"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class Manifest:
+    """ダウンロード済みファイルのサイズと ETag の記録（JSON）"""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._lock = threading.Lock()
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                self.entries: Dict[str, Dict[str, object]] = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            self.entries = {}
+
+    def get(self, key: str) -> Optional[Dict[str, object]]:
+        with self._lock:
+            return self.entries.get(key)
+
+    def update(self, key: str, entry: Dict[str, object]):
+        """1件記録してすぐに保存する（途中で中断しても記録は残る）"""
+        with self._lock:
+            self.entries[key] = entry
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.path.with_suffix(".tmp")
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.entries, f, ensure_ascii=False, indent=1, sort_keys=True)
+            tmp_path.replace(self.path)
+
+
+class FlagDownloader:
+    """国旗画像を並列にダウンロードするクラス
+
+    全スレッドで keep-alive の Session を共有し、リクエストはトークンバケットで制限する。
+    マニフェストに記録したサイズと一致するファイルは取得しない。
+    revalidate が True の場合は ETag を付けて問い合わせ、変更がなければ（304）取得しない。
+    url_template を変えるとローカルのHTTPサーバーなどからも取得できる。
     """
-    country_codes = {
-        "日本": "jp",
-        "アメリカ": "us",
-        "中国": "cn",
-        "韓国": "kr",
-        "イギリス": "gb",
-        "フランス": "fr",
-        "ドイツ": "de",
-        "イタリア": "it",
-        "スペイン": "es",
-        "オーストラリア": "au",
-        "カナダ": "ca",
-        "ブラジル": "br",
-        "インド": "in",
-        "ロシア": "ru",
-        "メキシコ": "mx",
-        "タイ": "th",
-        "ベトナム": "vn",
-        "インドネシア": "id",
-        "フィリピン": "ph",
-        "マレーシア": "my",
-        "シンガポール": "sg",
-        "トルコ": "tr",
-        "エジプト": "eg",
-        "南アフリカ": "za",
-        "ナイジェリア": "ng",
-        "アルゼンチン": "ar",
-        "チリ": "cl",
-        "ペルー": "pe",
-        "コロンビア": "co",
-        "ウルグアイ": "uy",
-        "パラグアイ": "py",
-        "ベネズエラ": "ve",
-        "エクアドル": "ec",
-        "ボリビア": "bo",
-        "ガイアナ": "gy",
-        "スリナム": "sr",
-        "ノルウェー": "no",
-        "スウェーデン": "se",
-        "フィンランド": "fi",
-        "デンマーク": "dk",
-        "オランダ": "nl",
-        "ベルギー": "be",
-        "スイス": "ch",
-        "オーストリア": "at",
-        "ポーランド": "pl",
-        "チェコ": "cz",
-        "ハンガリー": "hu",
-        "ルーマニア": "ro",
-        "ブルガリア": "bg",
-        "ギリシャ": "gr",
-        "クロアチア": "hr",
-        "セルビア": "rs",
-        "スロベニア": "si",
-        "スロバキア": "sk",
-        "ポルトガル": "pt",
-        "アイルランド": "ie",
-        "アイスランド": "is",
-        "リトアニア": "lt",
-        "ラトビア": "lv",
-        "エストニア": "ee",
-        "ウクライナ": "ua",
-        "ベラルーシ": "by",
-        "モルドバ": "md",
-        "ジョージア": "ge",
-        "アルメニア": "am",
-        "アゼルバイジャン": "az",
-        "カザフスタン": "kz",
-        "ウズベキスタン": "uz",
-        "キルギス": "kg",
-        "タジキスタン": "tj",
-        "トルクメニスタン": "tm",
-        "モンゴル": "mn",
-        "北朝鮮": "kp",
-        "ミャンマー": "mm",
-        "ラオス": "la",
-        "カンボジア": "kh",
-        "ブルネイ": "bn",
-        "東ティモール": "tl",
-        "パプアニューギニア": "pg",
-        "フィジー": "fj",
-        "ニュージーランド": "nz",
-        "バヌアツ": "vu",
-        "ソロモン諸島": "sb",
-        "サモア": "ws",
-        "トンガ": "to",
-        "ツバル": "tv",
-        "ナウル": "nr",
-        "キリバス": "ki",
-        "マーシャル諸島": "mh",
-        "ミクロネシア": "fm",
-        "パラオ": "pw",
-        "アフガニスタン": "af",
-        "パキスタン": "pk",
-        "バングラデシュ": "bd",
-        "スリランカ": "lk",
-        "ネパール": "np",
-        "ブータン": "bt",
-        "モルディブ": "mv",
-        "イラン": "ir",
-        "イラク": "iq",
-        "シリア": "sy",
-        "レバノン": "lb",
-        "ヨルダン": "jo",
-        "イスラエル": "il",
-        "パレスチナ": "ps",
-        "サウジアラビア": "sa",
-        "イエメン": "ye",
-        "オマーン": "om",
-        "UAE": "ae",
-        "カタール": "qa",
-        "バーレーン": "bh",
-        "クウェート": "kw",
-        "アルジェリア": "dz",
-        "モロッコ": "ma",
-        "チュニジア": "tn",
-        "リビア": "ly",
-        "スーダン": "sd",
-        "南スーダン": "ss",
-        "エチオピア": "et",
-        "エリトリア": "er",
-        "ジブチ": "dj",
-        "ソマリア": "so",
-        "ケニア": "ke",
-        "ウガンダ": "ug",
-        "タンザニア": "tz",
-        "ルワンダ": "rw",
-        "ブルンジ": "bi",
-        "マダガスカル": "mg",
-        "モーリシャス": "mu",
-        "セーシェル": "sc",
-        "コモロ": "km",
-        "モザンビーク": "mz",
-        "ザンビア": "zm",
-        "ジンバブエ": "zw",
-        "ボツワナ": "bw",
-        "ナミビア": "na",
-        "レソト": "ls",
-        "エスワティニ": "sz",
-        "マラウイ": "mw",
-        "アンゴラ": "ao",
-        "ガボン": "ga",
-        "赤道ギニア": "gq",
-        "サントメ・プリンシペ": "st",
-        "カメルーン": "cm",
-        "中央アフリカ": "cf",
-        "チャド": "td",
-        "コンゴ共和国": "cg",
-        "コンゴ民主共和国": "cd",
-        "ニジェール": "ne",
-        "マリ": "ml",
-        "ブルキナファソ": "bf",
-        "ガーナ": "gh",
-        "コートジボワール": "ci",
-        "リベリア": "lr",
-        "シエラレオネ": "sl",
-        "ギニア": "gn",
-        "ギニアビサウ": "gw",
-        "セネガル": "sn",
-        "ガンビア": "gm",
-        "カーボベルデ": "cv",
-        "モーリタニア": "mr",
-        "ベナン": "bj",
-        "トーゴ": "tg"
-    }
-    return country_codes
-
-def main():
+
+    def __init__(self, flags_dir: str = DEFAULT_FLAGS_DIR, sizes: Iterable[str] = DEFAULT_SIZES,
+                 workers: int = DEFAULT_WORKERS, rate: float = DEFAULT_RATE,
+                 url_template: str = FLAG_CDN_URL, revalidate: bool = False,
+                 session: Optional[requests.Session] = None):
+        self.flags_dir = Path(flags_dir)
+        self.sizes = list(sizes)
+        self.workers = workers
+        self.url_template = url_template
+        self.revalidate = revalidate
+        self.bucket = TokenBucket(rate)
+        self.manifest = Manifest(self.flags_dir / MANIFEST_NAME)
+        self.session = session if session is not None else self._create_session(workers)
+
+    @staticmethod
+    def _create_session(workers: int) -> requests.Session:
+        session = requests.Session()
+        retry = Retry(total=3, backoff_factor=0.5, status_forcelist=(429, 500, 502, 503, 504),
+                      allowed_methods=("GET",))
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=workers, max_retries=retry)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        return session
+
+    def download_all(self, codes: Iterable[str]) -> Dict[str, int]:
+        """全ての国コード×サイズをダウンロードし、結果ごとの件数を返す"""
+        jobs = [(code.lower(), size) for code in codes for size in self.sizes]
+        counts = {DOWNLOADED: 0, UNCHANGED: 0, SKIPPED: 0, FAILED: 0}
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            futures = {executor.submit(self.download, code, size): (code, size) for code, size in jobs}
+            for future in as_completed(futures):
+                code, size = futures[future]
+                result = future.result()
+                counts[result] += 1
+                if result == DOWNLOADED:
+                    print(f"Downloaded: {size}/{code}.png")
+        return counts
+
+    def download(self, code: str, size: str) -> str:
+        """1つの画像をダウンロードする（結果を返す）"""
+        path = flag_path(self.flags_dir, code, size)
+        key = path.relative_to(self.flags_dir).as_posix()
+        entry = self.manifest.get(key)
+        on_disk = entry is not None and path.exists() and path.stat().st_size == entry.get('size')
+        if on_disk and not self.revalidate:
+            return SKIPPED
+
+        headers = {}
+        if on_disk and entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+
+        self.bucket.acquire()
+        try:
+            response = self.session.get(self.url_template.format(size=size, code=code),
+                                        headers=headers, timeout=REQUEST_TIMEOUT)
+            if response.status_code == 304:
+                return UNCHANGED
+            response.raise_for_status()
+        except requests.RequestException as e:
+            print(f"Failed to download {key}: {e}")
+            return FAILED
+
+        data = response.content
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = path.with_suffix(".part")
+            tmp_path.write_bytes(data)
+            tmp_path.replace(path)
+        except OSError as e:
+            print(f"Failed to save {key}: {e}")
+            return FAILED
+        self.manifest.update(key, {'size': len(data), 'etag': response.headers.get('ETag')})
+        return DOWNLOADED
+
+
+def load_country_codes(countries_path: Path = SCRIPT_DIR / 'countries.json') -> List[str]:
+    """countries.json の国コード一覧"""
+    with open(countries_path, 'r', encoding='utf-8') as f:
+        countries = json.load(f)
+    return [country['code'] for country in countries if country.get('code')]
+
+
+def main(argv: Optional[List[str]] = None):
     """メイン処理"""
+    parser = argparse.ArgumentParser(description="国旗画像をまとめてダウンロードする")
+    parser.add_argument("--output", default=DEFAULT_FLAGS_DIR, help="保存先フォルダ")
+    parser.add_argument("--sizes", default=",".join(DEFAULT_SIZES), help="画像サイズ（カンマ区切り）")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="同時に実行するダウンロード数")
+    parser.add_argument("--rate", type=float, default=DEFAULT_RATE, help="1秒あたりのリクエスト数の上限")
+    parser.add_argument("--base-url", default=None,
+                        help="取得元（例: http://127.0.0.1:8000 → <base-url>/<size>/<code>.png）")
+    parser.add_argument("--revalidate", action="store_true", help="保存済みの画像も ETag で更新を確認する")
+    args = parser.parse_args(argv)
+
+    url_template = FLAG_CDN_URL
+    if args.base_url:
+        url_template = args.base_url.rstrip("/") + "/{size}/{code}.png"
+
     print("国旗画像ダウンロード開始...")
-    
-    # countries.jsonを読み込み
-    with open('data/countries.json', 'r', encoding='utf-8') as f:
-        countries = json.load(f)
-    
-    # 国コードマッピング取得
-    country_codes = get_country_codes()
-    
-    # data/flags フォルダを作成
-    Path("data/flags").mkdir(parents=True, exist_ok=True)
-    
-    success_count = 0
-    total_count = len(countries)
-    
-    for country in countries:
-        country_name = country['name']
-        filename = country['flag']
-        
-        if country_name in country_codes:
-            country_code = country_codes[country_name]
-            
-            # 画像をダウンロード
-            if download_flag_image(country_code, filename):
-                success_count += 1
-            
-            # レート制限対策
-            time.sleep(0.5)
-        else:
-            print(f"Country code not found for: {country_name}")
-    
-    print(f"\nダウンロード完了: {success_count}/{total_count} 件")
-    print(f"保存先: data/flags/")
+    start = time.perf_counter()
+    codes = load_country_codes()
+    downloader = FlagDownloader(flags_dir=args.output, sizes=args.sizes.split(","), workers=args.workers,
+                                rate=args.rate, url_template=url_template, revalidate=args.revalidate)
+    counts = downloader.download_all(codes)
+
+    total_count = len(codes) * len(downloader.sizes)
+    print(f"\nダウンロード完了: {counts[DOWNLOADED]}/{total_count} 件"
+          f"（変更なし {counts[UNCHANGED]} 件、保存済み {counts[SKIPPED]} 件、失敗 {counts[FAILED]} 件）"
+          f" {time.perf_counter() - start:.1f} 秒")
+    print(f"保存先: {args.output}")
+    return counts
+
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
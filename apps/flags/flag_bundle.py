@@ -0,0 +1,86 @@
+import json
+import mmap
+import struct
+from pathlib import Path
+from typing import Dict, Iterator, Optional, Tuple
+
+# バンドルの形式:
+#   ヘッダー  MAGIC(8バイト) + バージョン(uint16) + 索引の長さ(uint32)（リトルエンディアン）
+#   索引      JSON {"国コード": [画像データ部の先頭からのオフセット, 長さ], ...}
+#   画像データ 各PNGをそのまま連結したもの
+MAGIC = b"FLAGBNDL"
+VERSION = 1
+HEADER = struct.Struct("<8sHI")
+
+
+def bundle_path(flags_dir: Path, size: str) -> Path:
+    """サイズごとのバンドルの保存先（data/flags/flags_<サイズ>.bundle）"""
+    return Path(flags_dir) / f"flags_{size}.bundle"
+
+
+def write_bundle(path: Path, images: Dict[str, bytes]):
+    """国コード→画像データをバンドルファイルに書き出す"""
+    codes = sorted(images)
+    index = {}
+    position = 0
+    for code in codes:
+        index[code.lower()] = [position, len(images[code])]
+        position += len(images[code])
+    encoded = json.dumps(index, separators=(",", ":")).encode("utf-8")
+
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(".tmp")
+    with open(tmp_path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, len(encoded)))
+        f.write(encoded)
+        for code in codes:
+            f.write(images[code])
+    tmp_path.replace(path)
+
+
+class FlagBundle:
+    """メモリマップしたバンドルから国旗画像を取り出すクラス
+
+    画像は mmap 上の memoryview のスライスとして返すため、読み出し時にコピーもファイルアクセスもない。
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        with open(self.path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, index_length = HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC or version != VERSION:
+            self._mmap.close()
+            raise ValueError(f"国旗バンドルの形式が正しくありません: {self.path}")
+        index = json.loads(self._mmap[HEADER.size:HEADER.size + index_length])
+        data_start = HEADER.size + index_length
+        self._index: Dict[str, Tuple[int, int]] = {
+            code: (data_start + offset, length) for code, (offset, length) in index.items()
+        }
+        self._view = memoryview(self._mmap)
+
+    @classmethod
+    def open(cls, path: Path) -> Optional["FlagBundle"]:
+        """バンドルを開く（ファイルがない・壊れている場合は None）"""
+        try:
+            return cls(path)
+        except (OSError, ValueError, struct.error):
+            return None
+
+    def __contains__(self, code: str) -> bool:
+        return code.lower() in self._index
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._index)
+
+    def get(self, code: str) -> Optional[memoryview]:
+        """国旗画像（mmap 上のスライス。なければ None）"""
+        entry = self._index.get(code.lower())
+        if entry is None:
+            return None
+        offset, length = entry
+        return self._view[offset:offset + length]
@@ -0,0 +1,122 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Set
+
+import requests
+
+from flag_bundle import FlagBundle, bundle_path
+
+# 環境変数で保存先と画像サイズを変更できる（FLAGS_ALLOW_REMOTE=0 ならCDNには一切取りに行かない）
+DEFAULT_FLAGS_DIR = os.getenv("FLAGS_DIR", str(Path(__file__).resolve().parent / "data" / "flags"))
+DEFAULT_SIZE = os.getenv("FLAGS_SIZE", "w320")
+ALLOW_REMOTE = os.getenv("FLAGS_ALLOW_REMOTE", "1") == "1"
+
+FLAG_CDN_URL = "https://flagcdn.com/{size}/{code}.png"
+REMOTE_TIMEOUT = 10  # 秒
+REMOTE_RETRY_SECONDS = 60  # CDNからの取得に失敗した国旗を再び取りに行くまでの時間
+PREFETCH_WORKERS = 2
+
+
+def flag_path(flags_dir: Path, code: str, size: str = DEFAULT_SIZE) -> Path:
+    """国旗画像の保存先（data/flags/<サイズ>/<国コード>.png）"""
+    return Path(flags_dir) / size / f"{code.lower()}.png"
+
+
+class FlagStore:
+    """国旗画像のストア（メモリ＋ローカルディスク）
+
+    画像は download_flags.py で事前に flags_dir に保存しておく。
+    build_flag_bundle.py で作ったバンドルがあれば、画像はメモリマップしたバンドルから辞書1回の参照で取り出す。
+    バンドルにない画像は個別のファイルから読み込み、プロセス内の全セッションで共有する。
+    ローカルにない画像だけ、allow_remote が True ならCDNから1回だけ取得してディスクに保存する。
+    取得に失敗した画像もディスクは毎回確認し、CDNには REMOTE_RETRY_SECONDS 秒たってから取りに行き直す。
+    """
+
+    def __init__(self, flags_dir: str = DEFAULT_FLAGS_DIR, size: str = DEFAULT_SIZE,
+                 allow_remote: bool = ALLOW_REMOTE):
+        self.flags_dir = Path(flags_dir)
+        self.size = size
+        self.allow_remote = allow_remote
+        self.bundle = FlagBundle.open(bundle_path(self.flags_dir, size))
+        self._images: Dict[str, bytes] = {}
+        self._failed: Dict[str, float] = {}  # CDNからの取得に失敗した国コードと時刻
+        self._pending: Set[str] = set()
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=PREFETCH_WORKERS, thread_name_prefix="flag-prefetch")
+
+    def get(self, code: str) -> Optional[bytes]:
+        """国旗画像のバイト列（取得できなければ None）"""
+        code = code.lower()
+        if self.bundle is not None:
+            view = self.bundle.get(code)
+            if view is not None:
+                return bytes(view)  # st.image は bytes しか受け付けない
+
+        with self._lock:
+            data = self._images.get(code)
+            if data is not None:
+                return data
+            failed_at = self._failed.get(code)
+
+        # 起動後にダウンロードされた画像も使えるように、ディスクは毎回確認する
+        data = self._read_disk(code)
+        if data is None and self.allow_remote and (
+                failed_at is None or time.monotonic() - failed_at >= REMOTE_RETRY_SECONDS):
+            data = self._fetch_remote(code)
+            if data is None:
+                with self._lock:
+                    self._failed[code] = time.monotonic()
+        if data is not None:
+            with self._lock:
+                self._images[code] = data
+                self._failed.pop(code, None)
+        return data
+
+    def prefetch(self, codes: Iterable[str]):
+        """次に表示する国旗をバックグラウンドでメモリに読み込んでおく"""
+        for code in codes:
+            code = code.lower()
+            if self.bundle is not None and code in self.bundle:
+                continue
+            with self._lock:
+                if code in self._images or code in self._pending:
+                    continue
+                self._pending.add(code)
+            self._executor.submit(self._prefetch_one, code)
+
+    def _prefetch_one(self, code: str):
+        try:
+            self.get(code)
+        finally:
+            with self._lock:
+                self._pending.discard(code)
+
+    def _read_disk(self, code: str) -> Optional[bytes]:
+        try:
+            return flag_path(self.flags_dir, code, self.size).read_bytes()
+        except OSError:
+            return None
+
+    def _fetch_remote(self, code: str) -> Optional[bytes]:
+        try:
+            response = requests.get(FLAG_CDN_URL.format(size=self.size, code=code), timeout=REMOTE_TIMEOUT)
+            response.raise_for_status()
+        except requests.RequestException:
+            return None
+        data = response.content
+        try:
+            path = flag_path(self.flags_dir, code, self.size)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = path.with_suffix(".tmp")
+            tmp_path.write_bytes(data)
+            tmp_path.replace(path)
+        except OSError:
+            pass
+        return data
+
+
+# プロセス内の全セッションで共有するストア
+flag_store = FlagStore()
@@ -1,6 +1,6 @@
 import streamlit as st
 import json
-import random
+import sys
 import time
 import os
 import uuid
@@ -9,71 +9,57 @@ import urllib.parse
 import base64
 import urllib.parse
 
+# 現在のスクリプトのディレクトリをsys.pathに追加
+current_dir = os.path.dirname(os.path.abspath(__file__))
+if current_dir not in sys.path:
+    sys.path.append(current_dir)
+
+# リポジトリ直下の共通モジュールを読み込めるようにする
+root_dir = os.path.dirname(os.path.dirname(current_dir))
+if root_dir not in sys.path:
+    sys.path.append(root_dir)
+
+from country_catalog import COUNTRIES_PATH, CountryCatalog, get_catalog
+from flag_store import flag_store
+from instrumentation import phase
+from quiz_plan import QuizPlan, parse_quiz_id
+
 
 def get_base64_image(image_path):
-    with open(image_path, "rb") as img_file:
+    with phase("base64_encode"), open(image_path, "rb") as img_file:
         return base64.b64encode(img_file.read()).decode()
 
 def load_countries():
-    """国名データを読み込む"""
-    # スクリプトファイルのディレクトリを基準とした絶対パス
-    script_dir = os.path.dirname(os.path.abspath(__file__))
-    countries_path = os.path.join(script_dir, 'countries.json')
-    
+    """国名データを読み込む（プロセス内で共有する一覧。読み込むのは初回だけ）"""
     try:
-        with open(countries_path, 'r', encoding='utf-8') as f:
-            return json.load(f)
+        with phase("json_load"):
+            return get_catalog()
     except FileNotFoundError:
-        st.error(f"countries.jsonファイルが見つかりません: {countries_path}")
+        st.error(f"countries.jsonファイルが見つかりません: {COUNTRIES_PATH}")
         st.info("dataフォルダとcountries.jsonファイルが存在することを確認してください。")
-        return []
-    except json.JSONDecodeError:
+        return CountryCatalog(())
+    except (json.JSONDecodeError, KeyError):
         st.error("countries.jsonファイルの形式が正しくありません。")
-        return []
+        return CountryCatalog(())
+
 
+def show_flag_image(country):
+    """国旗画像を表示（ローカルの画像ストアから）"""
+    with phase("image_fetch"):
+        _show_flag_image(country)
 
-def get_random_options(countries, correct_answer, num_options=4):
-    """正解を含む選択肢を生成する"""
-    options = [correct_answer]
-    other_countries = [c['name'] for c in countries if c['name'] != correct_answer]
-    options.extend(random.sample(other_countries, num_options - 1))
-    random.shuffle(options)
-    return options
 
+def _show_flag_image(country):
+    if not country.code:
+        st.error(f"国コードが見つかりません: {country.name}")
+        return
 
-def show_flag_image(country):
-    """国旗画像を表示（API経由、フォールバック付き）"""
-    if 'code' in country:
-        # 複数のAPIを順番に試行
-        flag_urls = [
-            f"https://flagcdn.com/w320/{country['code'].lower()}.png",
-            f"https://flagsapi.com/{country['code'].upper()}/flat/256.png",
-            f"https://countryflagsapi.netlify.app/flag/{country['code'].lower()}.svg"
-        ]
-        
-        image_displayed = False
-        
-        for i, flag_url in enumerate(flag_urls):
-            try:
-                st.image(flag_url, width=300)
-                if i > 0:  # 最初のAPI以外を使用した場合
-                    st.caption(f"🌐 API {i+1}から取得")
-                image_displayed = True
-                break
-            except Exception:
-                continue
-        
-        # 全てのAPIが失敗した場合、ローカルファイルにフォールバック
-        if not image_displayed:
-            flag_path = f"data/flags/{country['flag']}"
-            if os.path.exists(flag_path):
-                st.image(flag_path, width=300)
-                st.caption("⚠️ ローカル画像を表示中")
-            else:
-                st.error(f"国旗画像を取得できません: {country['name']}")
-                st.info("ネットワーク接続とローカルファイルを確認してください")
+    image = flag_store.get(country.code)
+    if image is not None:
+        st.image(image, width=300)
     else:
-        st.error(f"国コードが見つかりません: {country['name']}")
+        st.error(f"国旗画像を取得できません: {country.name}")
+        st.info("download_flags.py で国旗画像をダウンロードしてください")
 
 
 def main():
@@ -84,18 +70,17 @@ def main():
     # セッション状態の初期化
     if 'game_state' not in st.session_state:
         st.session_state.game_state = 'menu'
-    if 'countries' not in st.session_state:
-        st.session_state.countries = load_countries()
+    countries = load_countries()
     if 'current_question' not in st.session_state:
         st.session_state.current_question = 0
     if 'correct_answers' not in st.session_state:
         st.session_state.correct_answers = 0
     if 'start_time' not in st.session_state:
         st.session_state.start_time = None
+    if 'quiz_plan' not in st.session_state:  # 出題順と全問の選択肢
+        st.session_state.quiz_plan = None
     if 'questions' not in st.session_state:
         st.session_state.questions = []
-    if 'current_options' not in st.session_state:  # 追加：現在の選択肢を保存
-        st.session_state.current_options = []
     if 'selected_answer' not in st.session_state:
         st.session_state.selected_answer = None
     if 'show_result' not in st.session_state:
@@ -112,17 +97,35 @@ def main():
         st.markdown("🎯 国旗を見て、正しい国名を4つの選択肢から選んでください")
         st.info("問題数を選択してください")
 
+        # 同じクイズをもう一度あそぶ場合はクイズIDを指定する
+        quiz_id_text = st.text_input(
+            "クイズID（同じ問題であそぶ場合のみ）",
+            key="quiz_id_input",
+            help="結果画面に表示されるIDです。同じ問題数を選ぶと、同じ順番・同じ選択肢で出題されます。"
+        )
+
+        num_questions = None
         if st.button("10問", use_container_width=True):
-            start_game(10)
+            num_questions = 10
 
         if st.button("30問", use_container_width=True):
-            start_game(30)
+            num_questions = 30
 
         if st.button("100問", use_container_width=True):
-            start_game(100)
+            num_questions = 100
 
         if st.button("すべての国", use_container_width=True):
-            start_game(len(st.session_state.countries))
+            num_questions = len(countries)
+
+        if num_questions is not None:
+            seed = None
+            if quiz_id_text.strip():
+                try:
+                    seed = parse_quiz_id(quiz_id_text)
+                except ValueError as e:
+                    st.error(f"❌ {e}")
+                    st.stop()
+            start_game(num_questions, seed)
 
 
     # ゲーム画面
@@ -135,8 +138,8 @@ def main():
         show_results()
 
 
-def start_game(num_questions):
-    """ゲームを開始する"""
+def start_game(num_questions, seed=None):
+    """ゲームを開始する（出題順と全問の選択肢をここでまとめて決める）"""
     st.session_state.game_state = 'playing'
     st.session_state.current_question = 0
     st.session_state.correct_answers = 0
@@ -145,12 +148,14 @@ def start_game(num_questions):
     st.session_state.show_result = False
     st.session_state.answers_history = []
 
-    # 問題をランダムに選択
-    selected_countries = random.sample(st.session_state.countries, num_questions)
-    st.session_state.questions = selected_countries
+    # 問題と選択肢をシード値から一度に作成
+    with phase("generation"):
+        plan = QuizPlan.build(get_catalog(), num_questions, seed)
+    st.session_state.quiz_plan = plan
+    st.session_state.questions = plan.countries
 
-    # 最初の問題の選択肢を生成
-    generate_options_for_current_question()
+    # 出題する国旗を出題順にバックグラウンドで読み込んでおく
+    flag_store.prefetch(plan.flag_codes)
 
     # 最初の問題の開始時刻を記録
     st.session_state.question_start_time = time.time()
@@ -158,18 +163,6 @@ def start_game(num_questions):
     st.rerun()
 
 
-def generate_options_for_current_question():
-    """現在の問題の選択肢を生成"""
-    if st.session_state.current_question < len(st.session_state.questions):
-        current_country = st.session_state.questions[st.session_state.current_question]
-        st.session_state.current_options = get_random_options(
-            st.session_state.countries,
-            current_country['name']
-        )
-        # 問題開始時刻を記録
-        st.session_state.question_start_time = time.time()
-
-
 def show_game():
     """ゲーム画面を表示"""
     if st.session_state.current_question >= len(st.session_state.questions):
@@ -196,7 +189,8 @@ def show_game():
 
         # 選択肢ボタン
         with colB:
-            for i, option in enumerate(st.session_state.current_options):
+            options = st.session_state.quiz_plan.questions[st.session_state.current_question].options
+            for i, option in enumerate(options):
 
 
                 button_key = f"option_{st.session_state.current_question}_{i}"
@@ -206,13 +200,13 @@ def show_game():
                     answer_time = time.time() - st.session_state.question_start_time
 
                     # 正解・不正解の判定
-                    is_correct = option == current_country['name']
+                    is_correct = option == current_country.name
                     if is_correct:
                         st.session_state.correct_answers += 1
 
                     # 回答履歴に追加
                     st.session_state.answers_history.append({
-                        'question': current_country['name'],
+                        'question': current_country.name,
                         'selected': option,
                         'correct': is_correct,
                         'answer_time': answer_time
@@ -236,12 +230,12 @@ def show_game():
             with colB:
                 st.info(f"⏱️ 回答時間: {answer_time:.1f}秒")
 
-        if st.session_state.selected_answer == current_country['name']:
+        if st.session_state.selected_answer == current_country.name:
             with colB:
-                st.success(f"✅ 正解！ {current_country['name']} です")
+                st.success(f"✅ 正解！ {current_country.name} です")
         else:
             with colB:
-                st.error(f"❌ 不正解... 正解は {current_country['name']} でした")
+                st.error(f"❌ 不正解... 正解は {current_country.name} でした")
                 st.info(f"あなたの答え: {st.session_state.selected_answer}")
 
         # 次の問題に進む
@@ -266,8 +260,8 @@ def move_to_next_question():
     st.session_state.selected_answer = None
     st.session_state.show_result = False
 
-    # 次の問題の選択肢を生成
-    generate_options_for_current_question()
+    # 選択肢は開始時に作成済みなので、問題開始時刻を記録するだけ
+    st.session_state.question_start_time = time.time()
 
     st.rerun()
 
@@ -328,13 +322,18 @@ def show_results():
             time_str = f"{answer['answer_time']:.1f}秒"
             st.write(f"{i + 1}. {answer['question']} - {status} ({answer['selected']}) - {time_str}")
 
+    # 同じ問題で再挑戦・対戦するためのクイズID
+    quiz_id = st.session_state.quiz_plan.quiz_id
+    st.caption(f"クイズID: {quiz_id}（メニューで入力すると同じ問題であそべます）")
+
     # SNSシェアセクションを呼び出し
     create_sns_share_section(
         accuracy=accuracy,
         correct_answers=st.session_state.correct_answers,
         total_questions=len(st.session_state.questions),
         minutes=minutes,
-        seconds=seconds
+        seconds=seconds,
+        quiz_id=quiz_id
     )
 
     # ホームに戻る
@@ -343,7 +342,7 @@ def show_results():
         st.rerun()
 
 
-def create_sns_share_section(accuracy, correct_answers, total_questions, minutes, seconds):
+def create_sns_share_section(accuracy, correct_answers, total_questions, minutes, seconds, quiz_id=""):
     """Creates an automatic SNS share section for results."""
 
 
@@ -383,6 +382,8 @@ def create_sns_share_section(accuracy, correct_answers, total_questions, minutes
 正答数: {correct_answers}/{total_questions}
 タイム: {minutes} 分 {seconds} 秒
 """
+    if quiz_id:
+        share_text += f"クイズID: {quiz_id}\n"
 
     page_url = "https://flags-ddeberias.streamlit.app"
     page_title = "🏳国旗クイズ🏳"
@@ -0,0 +1,65 @@
+import random
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+from country_catalog import Country, CountryCatalog
+from seed_id import format_seed_id, new_seed, parse_seed_id
+
+NUM_OPTIONS = 4
+
+
+def quiz_id(seed: int) -> str:
+    """シード値から共有用のクイズIDを作る"""
+    return format_seed_id(seed)
+
+
+def parse_quiz_id(text: str) -> int:
+    """クイズIDをシード値に戻す（形式が正しくなければ ValueError）"""
+    return parse_seed_id(text, "クイズID")
+
+
+@dataclass(frozen=True)
+class QuizQuestion:
+    """1問分の出題内容（正解の国と、正解を含む選択肢）"""
+    country: Country
+    options: Tuple[str, ...]
+
+
+@dataclass(frozen=True)
+class QuizPlan:
+    """ゲーム開始時にまとめて作る出題計画
+
+    出題順と全問の選択肢をシード値から一度に決めるため、次の問題へ進むときは番号を進めるだけでよい。
+    同じシード値と問題数からは同じクイズが作られる。
+    """
+    seed: int
+    questions: Tuple[QuizQuestion, ...]
+
+    @classmethod
+    def build(cls, catalog: CountryCatalog, num_questions: int, seed: Optional[int] = None,
+              num_options: int = NUM_OPTIONS) -> "QuizPlan":
+        if seed is None:
+            seed = new_seed()
+        rng = random.Random(seed)
+        countries = catalog.sample(min(num_questions, len(catalog)), rng)
+        questions = tuple(
+            QuizQuestion(country, tuple(catalog.sample_options(country.name, num_options, rng)))
+            for country in countries
+        )
+        return cls(seed, questions)
+
+    def __len__(self) -> int:
+        return len(self.questions)
+
+    @property
+    def quiz_id(self) -> str:
+        return quiz_id(self.seed)
+
+    @property
+    def countries(self) -> Tuple[Country, ...]:
+        return tuple(question.country for question in self.questions)
+
+    @property
+    def flag_codes(self) -> Tuple[str, ...]:
+        """先読みする国旗の国コード（出題順）"""
+        return tuple(question.country.code for question in self.questions if question.country.code)
@@ -1,8 +1,17 @@
 import streamlit as st
+import os
 import random
+import sys
 import time
 import operator
 
+# リポジトリ直下の共通モジュールを読み込めるようにする
+root_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if root_dir not in sys.path:
+    sys.path.append(root_dir)
+
+from instrumentation import phase
+
 # ページ設定
 st.set_page_config(page_title="フラッシュあんざん", layout="centered", initial_sidebar_state="collapsed")
 
@@ -68,19 +77,20 @@ with st.sidebar:
 # タイトルとスタート
 st.title("🧮 フラッシュあんざん")
 if st.button("▶ スタート", use_container_width=True):
-    digits = []
-    for _ in range(st.session_state.num_terms):
-        d = random.randint(st.session_state.min_digits, st.session_state.max_digits)
-        digits.append(random.randint(10 ** (d - 1), 10 ** d - 1))
-
-    if st.session_state.operator_choice == "÷":
-        result = digits[0]
-        for i in range(1, len(digits)):
+    with phase("generation"):
+        digits = []
+        for _ in range(st.session_state.num_terms):
             d = random.randint(st.session_state.min_digits, st.session_state.max_digits)
-            divisor = random.randint(10 ** (d - 1), 10 ** d - 1)
-            result *= divisor
-            digits[i] = divisor
-        digits[0] = result
+            digits.append(random.randint(10 ** (d - 1), 10 ** d - 1))
+
+        if st.session_state.operator_choice == "÷":
+            result = digits[0]
+            for i in range(1, len(digits)):
+                d = random.randint(st.session_state.min_digits, st.session_state.max_digits)
+                divisor = random.randint(10 ** (d - 1), 10 ** d - 1)
+                result *= divisor
+                digits[i] = divisor
+            digits[0] = result
 
     st.session_state.problems = digits
     st.session_state.operator = st.session_state.operator_choice
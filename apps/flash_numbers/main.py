@@ -7,6 +7,13 @@ current_dir = os.path.dirname(os.path.abspath(__file__))
 if current_dir not in sys.path:
     sys.path.append(current_dir)
 
+# リポジトリ直下の共通モジュールを読み込めるようにする
+root_dir = os.path.dirname(os.path.dirname(current_dir))
+if root_dir not in sys.path:
+    sys.path.append(root_dir)
+
+from instrumentation import phase
+
 from gui import (
     init_session_state,
     setup_page,
@@ -25,7 +32,8 @@ def main():
     # タイトルとスタート
     st.title("🔢 フラッシュ・ナンバーズ")
     if st.button("▶ スタート", use_container_width=True):
-        st.session_state.sequence = generate_sequence(st.session_state.sequence_length)
+        with phase("generation"):
+            st.session_state.sequence = generate_sequence(st.session_state.sequence_length)
         st.session_state.started = True
         st.session_state.current_index = 0
         st.session_state.showing_sequence = True
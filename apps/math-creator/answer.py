@@ -0,0 +1,57 @@
+from dataclasses import dataclass
+from fractions import Fraction
+from typing import List, Optional
+
+
+@dataclass(frozen=True, order=True)
+class Answer:
+    """計算結果
+
+    value は正確な値（Fraction）。余りありのわり算では value が商、remainder が余りになる。
+    比較・並べ替えは (value, remainder) の順で行う。
+    """
+    value: Fraction
+    remainder: int = 0
+
+    @property
+    def is_integer(self) -> bool:
+        return self.value.denominator == 1
+
+    @property
+    def quotient(self) -> int:
+        """整数部分（余りありのわり算では商）"""
+        return self.value.numerator // self.value.denominator
+
+    def __str__(self) -> str:
+        text = str(self.value)  # 整数なら "12"、分数なら "7/2"
+        if self.remainder:
+            text += f" 余り {self.remainder}"
+        return text
+
+
+def compute_answer(nums: List[int], operator: str, exact_division: bool = True) -> Optional[Answer]:
+    """左から順に計算する（計算できない式は None）
+
+    exact_division が False の場合、わり算は商と余りを求める。
+    途中で余りが出た式は表せないため None を返す。
+    """
+    value = Fraction(nums[0])
+    remainder = 0
+    for num in nums[1:]:
+        if remainder:
+            return None
+        if operator == "+":
+            value += num
+        elif operator == "-":
+            value -= num
+        elif operator == "*":
+            value *= num
+        elif operator == "/":
+            if num == 0:
+                return None
+            if exact_division:
+                value /= num
+            else:
+                quotient, remainder = divmod(value.numerator // value.denominator, num)
+                value = Fraction(quotient)
+    return Answer(value, remainder)
@@ -0,0 +1,194 @@
+import math
+import random
+from fractions import Fraction
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Set, Tuple, Union
+
+from answer import Answer
+from enumeration_engine import EnumerationEngine
+
+# 途中までの計算結果（余りありのわり算の最後だけ (商, 余り)）
+Value = Union[int, Tuple[int, int]]
+
+# かけ算・わり算で途中の値の集合を作るときの上限（超える設定では逆算モードを使わない）
+MAX_REACHABLE_VALUES = 200000
+MAX_PLAN_WORK = 1000000
+
+
+class _Plan(NamedTuple):
+    ranges: List[Tuple[int, int]]
+    # reachable[k]: k+1項目まで計算した値の取りうる範囲（足し算・引き算は (最小, 最大)、それ以外は集合）
+    reachable: List[Union[Tuple[int, int], Set[Value]]]
+    answers: List[Value]
+    free: bool  # 制約がなく、どの組み合わせも条件を満たす（答えから逆算する必要がない）
+
+
+class AnswerFirstBuilder:
+    """答えを先に決めてからオペランドを逆算するクラス（逆算モード用）
+
+    各項の数値範囲と答えの範囲から「k項目まで計算した値」の取りうる値を演算子ごとに一度だけ求めておく。
+    足し算・引き算では取りうる値が区間になるため両端だけを持ち、かけ算・わり算では
+    答えの範囲から単調性で絞り込んだ値の集合だけを持つ（1つ前の値と数の組は逆算するときに求める）。
+    答えは条件を満たすものだけから選び、そこから1項ずつさかのぼってオペランドを決めるため、
+    作った問題を条件で捨てることがない。
+
+    値の集合が大きくなりすぎる設定では計画を作らない（supports() が False）。
+    """
+
+    def __init__(self, settings: Dict[str, Any], is_valid: Callable[[Answer, str], bool],
+                 rng: Optional[random.Random] = None):
+        self.settings = settings
+        self.is_valid = is_valid
+        self.random = rng if rng is not None else random.Random()
+        self.attempts = 0  # 作った問題の数（ベンチマーク用）
+        self._plans: Dict[str, Optional[_Plan]] = {}
+
+    def supports(self, operator: str) -> bool:
+        """上限内で計画を作れるかどうか"""
+        return self._plan(operator) is not None
+
+    def has_answers(self, operator: str) -> bool:
+        """条件を満たす問題が1つでもあるかどうか"""
+        plan = self._plan(operator)
+        return plan is not None and (plan.free or bool(plan.answers))
+
+    def build(self, operator: str) -> Optional[List[int]]:
+        """条件を満たす答えを1つ選び、そこからオペランドを逆算する"""
+        plan = self._plan(operator)
+        if plan is None or not (plan.free or plan.answers):
+            return None
+        self.attempts += 1
+        if plan.free:
+            return [self.random.randint(low, high) for low, high in plan.ranges]
+
+        value = self.random.choice(plan.answers)
+        nums = []
+        for k in range(len(plan.ranges) - 1, 0, -1):
+            value, num = self._step_back(operator, plan, k, value)
+            nums.append(num)
+        nums.append(value)  # 1項目
+        return nums[::-1]
+
+    def _step_back(self, operator: str, plan: _Plan, k: int, value: Value) -> Tuple[int, int]:
+        """k+1項目まで計算した値 value になる (k項目までの値, k+1項目の数) を1つ選ぶ"""
+        low, high = plan.ranges[k]
+        previous = plan.reachable[k - 1]
+        if operator in ("+", "-"):
+            prev_low, prev_high = previous
+            # 左 = value - 数（足し算）、左 = value + 数（引き算）が1つ前の区間に入る数
+            if operator == "+":
+                low, high = max(low, value - prev_high), min(high, value - prev_low)
+            else:
+                low, high = max(low, prev_low - value), min(high, prev_high - value)
+            num = self.random.randint(low, high)
+            return (value - num if operator == "+" else value + num), num
+
+        if operator == "*":
+            if value == 0:
+                pairs = [(0, num) for num in range(low, high + 1)] if 0 in previous else []
+                if low <= 0 <= high:
+                    pairs += [(left, 0) for left in previous if left != 0]
+            else:
+                pairs = [(value // num, num) for num in range(low, high + 1)
+                         if num != 0 and value % num == 0 and value // num in previous]
+        elif isinstance(value, tuple):
+            quotient, remainder = value  # 余りありのわり算の最後
+            pairs = [(quotient * num + remainder, num) for num in range(max(low, remainder + 1), high + 1)
+                     if quotient * num + remainder in previous]
+        else:
+            pairs = [(value * num, num) for num in range(low, high + 1) if value * num in previous]
+        return self.random.choice(pairs)
+
+    def _plan(self, operator: str) -> Optional[_Plan]:
+        if operator not in self._plans:
+            self._plans[operator] = self._make_plan(operator)
+        return self._plans[operator]
+
+    def _make_plan(self, operator: str) -> Optional[_Plan]:
+        engine = EnumerationEngine(self.settings)
+        ranges = engine.operand_ranges(operator)
+        if any(low > high for low, high in ranges):
+            return _Plan(ranges, [], [], False)
+        answer_low, answer_high = engine.answer_bounds(operator, ranges)
+
+        if operator in ("+", "-"):
+            # 取りうる値は区間になる
+            reachable = [ranges[0]]
+            for low, high in ranges[1:]:
+                prev_low, prev_high = reachable[-1]
+                if operator == "+":
+                    reachable.append((prev_low + low, prev_high + high))
+                else:
+                    reachable.append((prev_low - high, prev_high - low))
+            final_low, final_high = reachable[-1]
+            answers = [value for value in range(max(final_low, answer_low), min(final_high, answer_high) + 1)
+                       if self.is_valid(self._answer(value), operator)]
+            return _Plan(ranges, reachable, answers, False)
+
+        if operator == "*" and (answer_low, answer_high) == engine.natural_bounds(operator, ranges):
+            # 積の制限も値制限もかからないため、どの組み合わせも条件を満たす
+            return _Plan(ranges, [], [], True)
+
+        exact = self.settings['div_limit'] == 1
+        bound_low, bound_high = self._prefix_bounds(operator, ranges, 0, answer_low, answer_high)
+        first_low, first_high = max(ranges[0][0], bound_low), min(ranges[0][1], bound_high)
+        if first_high - first_low + 1 > MAX_REACHABLE_VALUES:
+            return None
+        reachable = [set(range(int(first_low), int(first_high) + 1))]
+        work = 0
+        for k, (low, high) in enumerate(ranges[1:], start=1):
+            last = k == len(ranges) - 1
+            # 前の項の値を単調性による範囲で絞り込む
+            bound_low, bound_high = self._prefix_bounds(operator, ranges, k - 1, answer_low, answer_high)
+            values = {value for value in reachable[-1] if bound_low <= value <= bound_high}
+            reachable[-1] = values
+            work += len(values) * (high - low + 1)
+            if work > MAX_PLAN_WORK:
+                return None
+            step = set()
+            for left in values:
+                for num in range(low, high + 1):
+                    value = self._apply(operator, left, num, exact or not last)
+                    if value is not None:
+                        step.add(value)
+            if len(step) > MAX_REACHABLE_VALUES:
+                return None
+            reachable.append(step)
+
+        answers = sorted(value for value in reachable[-1] if self.is_valid(self._answer(value), operator))
+        return _Plan(ranges, reachable, answers, False)
+
+    @staticmethod
+    def _prefix_bounds(operator: str, ranges: List[Tuple[int, int]], k: int,
+                       answer_low: int, answer_high: int) -> Tuple[float, float]:
+        """k+1項目まで計算した値が答えの範囲に届くための範囲（絞り込めない場合は無制限）
+
+        かけ算はすべての数が1以上、わり算は被除数が0以上の場合だけ、値が単調に変化することを使う。
+        """
+        rest = ranges[k + 1:]
+        min_product = math.prod(low for low, _ in rest)
+        max_product = math.prod(high for _, high in rest)
+        if operator == "*" and all(low >= 1 for low, _ in ranges):
+            return -(-max(answer_low, 1) // max_product), answer_high // min_product
+        if operator == "/" and ranges[0][0] >= 0:
+            # 被除数 = 商 × 除数の積 (+ 最後のわり算の余り)
+            return max(answer_low, 0) * min_product, (answer_high + 1) * max_product - 1
+        return -math.inf, math.inf
+
+    @staticmethod
+    def _apply(operator: str, left: int, num: int, exact: bool) -> Optional[Value]:
+        """1項分の計算（途中で割り切れないわり算は None）"""
+        if operator == "+":
+            return left + num
+        if operator == "-":
+            return left - num
+        if operator == "*":
+            return left * num
+        if exact:
+            return left // num if left % num == 0 else None
+        return divmod(left, num)
+
+    @staticmethod
+    def _answer(value: Value) -> Answer:
+        if isinstance(value, tuple):
+            return Answer(Fraction(value[0]), value[1])
+        return Answer(Fraction(value))
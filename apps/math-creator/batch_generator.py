@@ -0,0 +1,183 @@
+import numpy as np
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from enumeration_engine import term_range
+
+# 演算子と整数コードの対応（重複判定のキーに使う）
+OPERATORS = ["+", "-", "*", "/"]
+OPERATOR_CODES = {op: code for code, op in enumerate(OPERATORS)}
+
+def quotient_range(settings: Dict[str, Any], product: Any) -> Tuple[Any, Any]:
+    """余りなしのわり算で、被除数 = 商 × product が被除数の範囲に入る商の範囲
+
+    解の値制限が有効な場合は、商をその範囲にも収める。product は整数でも配列でもよい。
+    """
+    dividend_low, dividend_high = term_range(settings, "/", 0)
+    low = -(-dividend_low // product)
+    high = dividend_high // product
+    if settings['value_limit_enabled'] == 2:
+        low = np.maximum(low, settings['value_min'])
+        high = np.minimum(high, settings['value_max'])
+    return low, high
+
+
+# すべての項を入れかえられる演算子（引き算・わり算は2項目以降のみ入れかえられる）
+COMMUTATIVE_OPERATORS = ("+", "*")
+
+
+def canonical_key(operator: str, nums: List[int], commutative: bool = False) -> Tuple[int, ...]:
+    """重複判定に使う整数の組 (演算子コード, オペランド...)
+
+    commutative が True の場合、順番を入れかえただけの式が同じキーになるよう並べ替える。
+    """
+    if commutative:
+        if operator in COMMUTATIVE_OPERATORS:
+            nums = sorted(nums)
+        else:
+            nums = [nums[0]] + sorted(nums[1:])
+    return (OPERATOR_CODES[operator], *nums)
+
+
+class BatchGenerator:
+    """NumPyで候補をまとめて生成・判定するクラス（通常モード用）
+
+    1問ずつ乱数を引いて判定する代わりに、数千件のオペランド行列を一度に引き、
+    答え・妥当性マスク・重複判定をベクトル演算でまとめて行う。
+    """
+
+    def __init__(self, settings: Dict[str, Any], rng: Optional[np.random.Generator] = None):
+        self.settings = settings
+        self.rng = rng if rng is not None else np.random.default_rng()
+        self.candidates_tried = 0  # これまでに調べた候補の数（ベンチマーク用）
+
+    def draw_operator_codes(self, operators: List[str], size: int) -> np.ndarray:
+        """各候補の演算子コードを一様に選ぶ"""
+        codes = np.array([OPERATOR_CODES[op] for op in operators], dtype=np.int64)
+        if len(codes) == 1:
+            return np.full(size, codes[0], dtype=np.int64)
+        return self.rng.choice(codes, size=size)
+
+    def draw_operands(self, operator: str, size: int) -> np.ndarray:
+        """オペランド行列（size × 項数）を生成する"""
+        term_count = self.settings['term_count']
+        nums = np.empty((size, term_count), dtype=np.int64)
+        for i in range(term_count):
+            low, high = term_range(self.settings, operator, i)
+            nums[:, i] = self.rng.integers(low, high + 1, size=size)
+
+        if operator == "/":
+            nums[:, 1:] = np.where(nums[:, 1:] == 0, 1, nums[:, 1:])
+            if self.settings['div_limit'] == 1:
+                nums[:, 0] = self._adjust_dividends(nums)
+        return nums
+
+    def _adjust_dividends(self, nums: np.ndarray) -> np.ndarray:
+        """余りなしの場合、除数部分の積の倍数に被除数を置き換える
+
+        該当する商がない行は元の被除数のまま残し、valid_mask で除外される。
+        """
+        product = np.prod(nums[:, 1:], axis=1)
+        low, high = quotient_range(self.settings, product)
+        empty = low > high
+        quotients = self.rng.integers(low, np.where(empty, low, high) + 1)
+        return np.where(empty, nums[:, 0], product * quotients)
+
+    def compute_answers(self, operator: str, nums: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """答え（わり算は商）・余り・計算可能かどうかをまとめて求める"""
+        size = len(nums)
+        remainders = np.zeros(size, dtype=np.int64)
+        computable = np.ones(size, dtype=bool)
+
+        if operator == "+":
+            values = nums.sum(axis=1)
+        elif operator == "-":
+            values = nums[:, 0] - nums[:, 1:].sum(axis=1)
+        elif operator == "*":
+            values = np.prod(nums, axis=1)
+        else:
+            values = nums[:, 0].copy()
+            # 最後の除数以外で余りが出る問題は表せないため除外
+            for i in range(1, nums.shape[1] - 1):
+                computable &= values % nums[:, i] == 0
+                values //= nums[:, i]
+            remainders = values % nums[:, -1]
+            values //= nums[:, -1]
+            if self.settings['div_limit'] == 1:
+                computable &= remainders == 0
+        return values, remainders, computable
+
+    def valid_mask(self, operator: str, nums: np.ndarray) -> np.ndarray:
+        """is_valid_question と同じ条件をベクトル演算で判定する"""
+        values, _, mask = self.compute_answers(operator, nums)
+
+        if operator == "+":
+            if self.settings['add_limit'] == 1:
+                mask &= values <= 10
+            elif self.settings['add_limit'] == 2:
+                mask &= (values > 10) & (values <= 20)
+        elif operator == "-":
+            if self.settings['sub_limit'] == 1:
+                mask &= values > 0
+        elif operator == "*":
+            if self.settings['mul_limit'] == 1:
+                mask &= values <= 100
+
+        if self.settings['value_limit_enabled'] == 2:
+            # 余りありのわり算は商で判定する
+            mask &= (values >= self.settings['value_min']) & (values <= self.settings['value_max'])
+        return mask
+
+    def canonical_rows(self, rows: np.ndarray) -> np.ndarray:
+        """canonical_key と同じ並べ替えを (演算子コード, オペランド...) の行にまとめて適用する"""
+        keys = rows.copy()
+        full = np.isin(keys[:, 0], [OPERATOR_CODES[op] for op in COMMUTATIVE_OPERATORS])
+        keys[full, 1:] = np.sort(keys[full, 1:], axis=1)
+        keys[~full, 2:] = np.sort(keys[~full, 2:], axis=1)
+        return keys
+
+    def iter_candidates(self, operators: List[str], batch_size: int, max_candidates: int,
+                        stale_batches: int = 3) -> Iterator[Tuple[str, List[int]]]:
+        """妥当かつ重複のない (演算子, オペランド) を生成順に返す
+
+        重複は canonical_key と同じ基準（設定の duplicate_mode に従う）で判定する。
+        新しい候補が出ないバッチが stale_batches 回続いた場合は、
+        条件を満たす組み合わせを出し尽くしたとみなして打ち切る。
+        candidates_tried には、途中で止めた場合もそれまでに調べた候補（バッチ内の位置）までを数える。
+        """
+        commutative = self.settings['duplicate_mode'] == 2
+        seen = set()
+        tried_before = self.candidates_tried
+        tried = 0
+        stale = 0
+        while tried < max_candidates and stale < stale_batches:
+            size = min(batch_size, max_candidates - tried)
+            batch_start = tried
+            tried += size
+
+            codes = self.draw_operator_codes(operators, size)
+            nums = np.empty((size, self.settings['term_count']), dtype=np.int64)
+            mask = np.zeros(size, dtype=bool)
+            for code in np.unique(codes):
+                rows = codes == code
+                operator = OPERATORS[code]
+                block = self.draw_operands(operator, int(rows.sum()))
+                nums[rows] = block
+                mask[rows] = self.valid_mask(operator, block)
+
+            candidates = np.column_stack([codes, nums])[mask]
+            positions = np.flatnonzero(mask)  # バッチ内の位置
+            stale += 1
+            if len(candidates) > 0:
+                keys = self.canonical_rows(candidates) if commutative else candidates
+                # バッチ内の重複を除き、最初に現れた順を保つ
+                _, first = np.unique(keys, axis=0, return_index=True)
+                first = np.sort(first)
+                for position, row, key in zip(positions[first].tolist(), candidates[first].tolist(),
+                                              map(tuple, keys[first].tolist())):
+                    if key in seen:
+                        continue
+                    seen.add(key)
+                    stale = 0
+                    self.candidates_tried = tried_before + batch_start + position + 1
+                    yield OPERATORS[row[0]], row[1:]
+            self.candidates_tried = tried_before + tried
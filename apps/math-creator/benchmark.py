@@ -0,0 +1,171 @@
+"""問題生成とPDF作成のベンチマーク（Streamlitなしで実行）
+
+使い方:
+    python benchmark.py                      # 全ケースを実行し、JSON Lines を標準出力へ
+    python benchmark.py --quick              # 少ないケースで素早く確認
+    python benchmark.py --output result.jsonl --no-pdf
+
+1ケースにつき1行のJSONを出力する。コミット間で比較できるよう、各行に git のリビジョンを含める。
+"""
+import argparse
+import itertools
+import json
+import os
+import subprocess
+import sys
+import time
+import tracemalloc
+from typing import Any, Dict, Iterator, List, Tuple
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+if current_dir not in sys.path:
+    sys.path.append(current_dir)
+
+# リポジトリ直下の共通モジュールを読み込めるようにする
+root_dir = os.path.dirname(os.path.dirname(current_dir))
+if root_dir not in sys.path:
+    sys.path.append(root_dir)
+
+from output_formatter import OutputFormatter, default_styles
+from problem_engine import COVERAGE_QUESTION_LIMIT, ProblemEngine, default_settings
+
+PROBLEM_TYPES = [1, 2, 3, 4, 5, 6]
+TERM_COUNTS = [2, 3, 4, 5]
+QUESTION_COUNTS = [30, 100, 1000, 5000]
+MODES = {"normal": 1, "coverage": 2, "sampling": 3, "inverse": 4}
+
+
+def term_ranges(prefix: str, first: Tuple[int, int], rest: Tuple[int, int]) -> Dict[str, int]:
+    """1項目と2～5項目の数値範囲の設定（項数によらず同じ範囲で計測する）"""
+    ranges = {f'{prefix}_min1': first[0], f'{prefix}_max1': first[1]}
+    for number in range(2, 6):
+        ranges.update({f'{prefix}_min{number}': rest[0], f'{prefix}_max{number}': rest[1]})
+    return ranges
+
+
+# 制約の厳しさのプリセット
+CONSTRAINTS = {
+    # 既定の制約に加え、解の値を狭い範囲に制限
+    "tight": {
+        'add_limit': 1, 'sub_limit': 1, 'mul_limit': 1, 'div_limit': 1,
+        'value_limit_enabled': 2, 'value_min': 0, 'value_max': 20,
+    },
+    # 制約なし・範囲を広めに
+    "loose": {
+        'add_limit': 3, 'sub_limit': 2, 'mul_limit': 2, 'div_limit': 2,
+        'value_limit_enabled': 1,
+        **term_ranges('add', (1, 20), (0, 20)),
+        **term_ranges('sub', (1, 20), (1, 20)),
+        **term_ranges('mul', (1, 12), (1, 12)),
+        **term_ranges('div', (1, 50), (1, 12)),
+    },
+}
+
+
+def git_revision() -> str:
+    """現在のコミット（取得できなければ空文字）"""
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=current_dir, stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def iter_cases(quick: bool = False) -> Iterator[Dict[str, Any]]:
+    """計測するケースの組み合わせ"""
+    problem_types = [1, 5, 6] if quick else PROBLEM_TYPES
+    term_counts = [2, 3] if quick else TERM_COUNTS
+    question_counts = [30, 1000] if quick else QUESTION_COUNTS
+
+    for problem_type, term_count, constraint in itertools.product(problem_types, term_counts, CONSTRAINTS):
+        for mode in MODES:
+            # 網羅モードは問題数ではなく全組み合わせを生成する（画面と同じ上限を演算子ごとに分け合う）
+            counts = [COVERAGE_QUESTION_LIMIT] if mode == "coverage" else question_counts
+            for question_count in counts:
+                yield {
+                    'problem_type': problem_type,
+                    'term_count': term_count,
+                    'constraint': constraint,
+                    'mode': mode,
+                    'question_count': question_count,
+                }
+
+
+def run_case(case: Dict[str, Any], seed: int, with_pdf: bool) -> Dict[str, Any]:
+    """1ケースを実行して計測結果を返す"""
+    settings = default_settings()
+    settings.update(CONSTRAINTS[case['constraint']])
+    settings.update(
+        problem_type=case['problem_type'],
+        term_count=case['term_count'],
+        generation_mode=MODES[case['mode']],
+        question_count=case['question_count'],
+    )
+    engine = ProblemEngine(settings)
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    problems_df, answers_df = engine.generate_problems(seed)
+    generate_seconds = time.perf_counter() - start
+    _, generate_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    candidates = engine.stats['candidates']
+    result = dict(case)
+    result.update(
+        seed=seed,
+        generated=len(problems_df),
+        candidates=candidates,
+        acceptance_rate=round(len(problems_df) / candidates, 6) if candidates else None,
+        generate_seconds=round(generate_seconds, 6),
+        generate_peak_bytes=generate_peak,
+    )
+
+    if with_pdf:
+        formatter = OutputFormatter(default_styles())
+        tracemalloc.start()
+        start = time.perf_counter()
+        pdf_buffer = formatter.build_pdf(problems_df, answers_df, settings)
+        pdf_seconds = time.perf_counter() - start
+        _, pdf_peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        result.update(
+            pdf_seconds=round(pdf_seconds, 6),
+            pdf_peak_bytes=pdf_peak,
+            pdf_bytes=len(pdf_buffer.getvalue()) if pdf_buffer is not None else None,
+        )
+    return result
+
+
+def main(argv: List[str] = None):
+    parser = argparse.ArgumentParser(description="けいさんドリルの生成・PDF作成のベンチマーク")
+    parser.add_argument("--quick", action="store_true", help="ケース数を減らして実行する")
+    parser.add_argument("--no-pdf", action="store_true", help="PDF作成を計測しない")
+    parser.add_argument("--seed", type=int, default=0, help="乱数のシード値")
+    parser.add_argument("--output", help="結果（JSON Lines）の出力先。省略時は標準出力")
+    args = parser.parse_args(argv)
+
+    revision = git_revision()
+    out = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    try:
+        for case in iter_cases(args.quick):
+            result = run_case(case, args.seed, not args.no_pdf)
+            result['revision'] = revision
+            out.write(json.dumps(result, ensure_ascii=False) + "\n")
+            out.flush()
+            # 経過は標準エラーへ
+            print(
+                f"type={case['problem_type']} terms={case['term_count']} {case['constraint']:<5} "
+                f"{case['mode']:<8} n={case['question_count']:<5} -> {result['generated']:>5}問 "
+                f"{result['generate_seconds'] * 1000:8.1f}ms "
+                f"pdf={result.get('pdf_seconds', 0) * 1000:8.1f}ms",
+                file=sys.stderr
+            )
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+import io
+import os
+import re
+import zipfile
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+from output_formatter import OutputFormatter
+from problem_engine import ProblemEngine
+from problem_set import parse_worksheet_id, worksheet_id
+from seed_id import new_seed
+
+# ZIP内のファイル名に使えない文字（パス区切り・Windowsで使えない記号・制御文字）
+UNSAFE_FILE_NAME_CHARS = re.compile(r'[\\/:*?"<>|\x00-\x1f\x7f]')
+
+
+def build_worksheet(job: Tuple[Dict[str, Any], Dict[str, Any], str, int]) -> Tuple[str, bytes]:
+    """1人分の問題生成とPDF作成（ワーカープロセスで実行）"""
+    settings, styles, student, seed = job
+    settings = dict(settings)
+    settings['header_text'] = f"{settings['header_text']}（{student}）"
+
+    generator = ProblemEngine(settings)
+    formatter = OutputFormatter(styles)
+    problem_set = generator.generate_problem_set(seed)
+    problems_df, answers_df = problem_set.to_frames()
+    pdf_buffer = formatter.create_pdf(problems_df, answers_df, settings, worksheet_id=problem_set.worksheet_id)
+
+    file_name = safe_file_name(f"{settings['header_text']}_{len(problems_df)}問.pdf")
+    return file_name, pdf_buffer.getvalue()
+
+
+def safe_file_name(name: str) -> str:
+    """生徒名などを含むファイル名を、展開してもフォルダが作られない1つのファイル名にする
+
+    パス区切りや使えない記号は「_」に置き換え、先頭の「.」や空白（「..」など）は取り除く。
+    """
+    return UNSAFE_FILE_NAME_CHARS.sub("_", name).lstrip(". ") or "_"
+
+
+def create_bulk_worksheets(settings: Dict[str, Any], styles: Dict[str, Any], students: List[str],
+                           seeds: Optional[List[int]] = None,
+                           max_workers: Optional[int] = None) -> Tuple[bytes, List[Tuple[str, int]]]:
+    """生徒ごとに異なる問題のPDFを並列で作成し、1つのZIPにまとめる
+
+    戻り値は (ZIPのバイト列, [(生徒名, ワークシートID), ...])。
+    ワークシートIDはPDFにも印字され、控えておけば同じプリントを再作成できる。
+    """
+    if seeds is None:
+        seeds = [new_seed() for _ in students]
+    jobs = [(settings, styles, student, seed) for student, seed in zip(students, seeds)]
+    workers = max_workers or min(len(jobs), os.cpu_count() or 1)
+
+    # Streamlitのサーバープロセスをforkしないよう spawn で起動する
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context) as executor:
+        results = list(executor.map(build_worksheet, jobs))
+
+    zip_buffer = io.BytesIO()
+    with zipfile.ZipFile(zip_buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+        for index, (file_name, pdf_bytes) in enumerate(results):
+            # 同名の生徒がいても上書きされないよう連番を付ける
+            archive.writestr(f"{index + 1:02d}_{file_name}", pdf_bytes)
+
+    return zip_buffer.getvalue(), [(student, worksheet_id(seed)) for student, seed in zip(students, seeds)]
+
+
+def parse_roster(roster_text: str, student_count: int) -> Tuple[List[str], List[int]]:
+    """「生徒名」または「生徒名,ワークシートID」を1行ずつ読み取る
+
+    名簿が空の場合は student_count 人分の番号を生徒名にする。
+    ワークシートIDが空欄の生徒には新しいシード値を使う。読み取れないIDがある場合は、
+    別の問題で作り直してしまわないよう、該当する行をまとめて ValueError で知らせる。
+    """
+    students, seeds, errors = [], [], []
+    for line_number, line in enumerate(roster_text.splitlines(), start=1):
+        name, _, seed = line.partition(",")
+        if not name.strip():
+            continue
+        students.append(name.strip())
+        if not seed.strip():
+            seeds.append(new_seed())
+            continue
+        try:
+            seeds.append(parse_worksheet_id(seed))
+        except ValueError as e:
+            errors.append(f"{line_number}行目（{name.strip()}）: {e}")
+
+    if errors:
+        raise ValueError("名簿のワークシートIDを読み取れません: " + "、".join(errors))
+    if not students:
+        students = [f"{i + 1:02d}" for i in range(student_count)]
+        seeds = [new_seed() for _ in students]
+    return students, seeds
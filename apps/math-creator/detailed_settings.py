@@ -1,6 +1,7 @@
 import streamlit as st
 from typing import Dict, Any
 from display_settings import show_display_settings
+from enumeration_engine import term_range
 
 def show_detailed_settings(generator):
     """詳細設定ページを表示"""
@@ -35,7 +36,7 @@ def show_detailed_settings(generator):
             with col1:
                 add_range1 = st.slider(
                     "加数1 範囲",
-                    min_value=1,
+                    min_value=0,
                     max_value=20,
                     value=(generator.settings['add_min1'], generator.settings['add_max1']),
                     key="add_range1_slider"
@@ -48,7 +49,7 @@ def show_detailed_settings(generator):
             with col2:
                 add_range2 = st.slider(
                     "加数2 範囲",
-                    min_value=1,
+                    min_value=0,
                     max_value=20,
                     value=(generator.settings['add_min2'], generator.settings['add_max2']),
                     key="add_range2_slider"
@@ -66,12 +67,13 @@ def show_detailed_settings(generator):
                 for i in range(3, generator.settings['term_count'] + 1):
                     add_range_extra = st.slider(
                         f"加数{i} 範囲",
-                        min_value=1,
+                        min_value=0,
                         max_value=20,
-                        value=(1, 10),
+                        value=term_range(generator.settings, "+", i - 1),
                         key=f"add_range{i}_slider"
                     )
-                    # 追加の数値範囲を設定に保存（必要に応じて実装）
+                    generator.settings[f'add_min{i}'] = add_range_extra[0]
+                    generator.settings[f'add_max{i}'] = add_range_extra[1]
                     st.caption(f"範囲: {add_range_extra[0]} ～ {add_range_extra[1]}")
         
         # 引き算の範囲設定
@@ -85,7 +87,7 @@ def show_detailed_settings(generator):
             with col1:
                 sub_range1 = st.slider(
                     "被減数 範囲",
-                    min_value=1,
+                    min_value=0,
                     max_value=20,
                     value=(generator.settings['sub_min1'], generator.settings['sub_max1']),
                     key="sub_range1_slider"
@@ -97,7 +99,7 @@ def show_detailed_settings(generator):
             with col2:
                 sub_range2 = st.slider(
                     "減数 範囲",
-                    min_value=1,
+                    min_value=0,
                     max_value=20,
                     value=(generator.settings['sub_min2'], generator.settings['sub_max2']),
                     key="sub_range2_slider"
@@ -115,11 +117,13 @@ def show_detailed_settings(generator):
                 for i in range(3, generator.settings['term_count'] + 1):
                     sub_range_extra = st.slider(
                         f"減数{i} 範囲",
-                        min_value=1,
+                        min_value=0,
                         max_value=20,
-                        value=(1, 10),
+                        value=term_range(generator.settings, "-", i - 1),
                         key=f"sub_range{i}_slider"
                     )
+                    generator.settings[f'sub_min{i}'] = sub_range_extra[0]
+                    generator.settings[f'sub_max{i}'] = sub_range_extra[1]
                     st.caption(f"範囲: {sub_range_extra[0]} ～ {sub_range_extra[1]}")
         
         # かけ算の範囲設定
@@ -165,9 +169,11 @@ def show_detailed_settings(generator):
                         f"乗数{i} 範囲",
                         min_value=1,
                         max_value=12,
-                        value=(1, 9),
+                        value=term_range(generator.settings, "*", i - 1),
                         key=f"mul_range{i}_slider"
                     )
+                    generator.settings[f'mul_min{i}'] = mul_range_extra[0]
+                    generator.settings[f'mul_max{i}'] = mul_range_extra[1]
                     st.caption(f"範囲: {mul_range_extra[0]} ～ {mul_range_extra[1]}")
         
         # わり算の範囲設定
@@ -213,9 +219,11 @@ def show_detailed_settings(generator):
                         f"除数{i} 範囲",
                         min_value=1,
                         max_value=12,
-                        value=(1, 9),
+                        value=term_range(generator.settings, "/", i - 1),
                         key=f"div_range{i}_slider"
                     )
+                    generator.settings[f'div_min{i}'] = div_range_extra[0]
+                    generator.settings[f'div_max{i}'] = div_range_extra[1]
                     st.caption(f"範囲: {div_range_extra[0]} ～ {div_range_extra[1]}")
     
     with tab2:
@@ -283,6 +291,16 @@ def show_detailed_settings(generator):
             generator.settings['value_min'] = value_range[0]
             generator.settings['value_max'] = value_range[1]
             st.caption(f"範囲: {generator.settings['value_min']} ～ {generator.settings['value_max']}")
+        
+        duplicate_mode = st.selectbox(
+            "重複の判定",
+            options=[1, 2],
+            format_func=lambda x: {1: "同じ式のみ", 2: "数の順番の入れかえも重複"}[x],
+            index=generator.settings['duplicate_mode'] - 1
+        )
+        generator.settings['duplicate_mode'] = duplicate_mode
+        st.write("💡 **重複の判定**: 「数の順番の入れかえも重複」にすると、3+5と5+3、10-3-2と10-2-3のように"
+                 "順番を入れかえただけの問題を同じ問題とみなし、1つだけ出題します。")
     
     with tab3:
         show_display_settings(generator) 
\ No newline at end of file
@@ -34,6 +34,48 @@ def show_display_settings(generator):
     generator.settings['header_text'] = header_text
     st.write("💡 **ヘッダー文字**: 印刷時のページ上部に表示されるタイトルを設定します。例：「計算プリント」「算数ドリル」など。")
     
+    # 段組み・余白・枠線の設定
+    st.markdown("---")
+    st.subheader("🖨️ 印刷レイアウト設定")
+    st.write("💡 **段組み**: 1ページに問題を何列並べるかを設定します。列を増やすとページ数が減り、用紙を節約できます。")
+    
+    col1, col2 = st.columns(2)
+    
+    with col1:
+        print_columns = st.selectbox(
+            "段数",
+            options=[1, 2, 3],
+            format_func=lambda x: f"{x}段",
+            index=generator.settings.get('print_columns', 2) - 1,
+            key="print_columns_select"
+        )
+        generator.settings['print_columns'] = print_columns
+        
+        print_margin = st.slider(
+            "余白 (mm)",
+            min_value=5,
+            max_value=30,
+            value=generator.settings.get('print_margin', 20),
+            key="print_margin_slider"
+        )
+        generator.settings['print_margin'] = print_margin
+    
+    with col2:
+        print_show_border = st.checkbox(
+            "枠線の表示",
+            value=generator.settings.get('print_show_border', True),
+            key="print_show_border_checkbox"
+        )
+        generator.settings['print_show_border'] = print_show_border
+        
+        print_show_grid = st.checkbox(
+            "グリッド線の表示",
+            value=generator.settings.get('print_show_grid', True),
+            key="print_show_grid_checkbox"
+        )
+        generator.settings['print_show_grid'] = print_show_grid
+    st.caption("列幅が1段に収まらない場合は、列幅と文字サイズを自動で縮小します。")
+    
     # A4印刷用の列幅設定
     st.markdown("---")
     st.subheader("📏 A4印刷用レイアウト設定")
@@ -0,0 +1,183 @@
+from typing import Any, Dict, Iterator, List, Tuple
+
+# 演算子ごとの設定キーの接頭辞
+RANGE_PREFIX = {"+": "add", "-": "sub", "*": "mul", "/": "div"}
+
+
+def term_range(settings: Dict[str, Any], operator: str, index: int) -> Tuple[int, int]:
+    """index 番目（0始まり）の項の数値範囲
+
+    設定キーは *_min1/*_max1 ～ *_min5/*_max5。
+    3項目以降が設定にない場合は2項目の範囲を使う。
+    """
+    prefix = RANGE_PREFIX[operator]
+    number = index + 1
+    low = settings.get(f'{prefix}_min{number}', settings[f'{prefix}_min2'])
+    high = settings.get(f'{prefix}_max{number}', settings[f'{prefix}_max2'])
+    if low > high:
+        low, high = high, low
+    return low, high
+
+
+class EnumerationEngine:
+    """制約で枝刈りしながらオペランドの組み合わせを列挙するクラス（網羅モード用）
+
+    足し算の合計制限・引き算の解の制限・かけ算の積の制限・解の値制限から
+    各項の取りうる範囲を先に絞り込むため、条件を満たさない組み合わせは生成しない。
+    """
+
+    def __init__(self, settings: Dict[str, Any]):
+        self.settings = settings
+
+    def operand_ranges(self, operator: str) -> List[Tuple[int, int]]:
+        """各項の数値範囲"""
+        ranges = []
+        for i in range(self.settings['term_count']):
+            low, high = term_range(self.settings, operator, i)
+            if operator == "/" and i > 0:
+                low = max(low, 1)  # 0で割らない
+            ranges.append((low, high))
+        return ranges
+
+    def answer_bounds(self, operator: str, ranges: List[Tuple[int, int]]) -> Tuple[int, int]:
+        """設定の制約から答えの取りうる範囲（両端を含む）を求める"""
+        low, high = self.natural_bounds(operator, ranges)
+
+        if operator == "+":
+            if self.settings['add_limit'] == 1:
+                high = min(high, 10)
+            elif self.settings['add_limit'] == 2:
+                low, high = max(low, 11), min(high, 20)
+        elif operator == "-":
+            if self.settings['sub_limit'] == 1:
+                low = max(low, 1)
+        elif operator == "*":
+            if self.settings['mul_limit'] == 1:
+                high = min(high, 100)
+
+        if self.settings['value_limit_enabled'] == 2:
+            low = max(low, self.settings['value_min'])
+            high = min(high, self.settings['value_max'])
+
+        return low, high
+
+    def natural_bounds(self, operator: str, ranges: List[Tuple[int, int]]) -> Tuple[int, int]:
+        """数値範囲だけから決まる答えの範囲"""
+        if operator == "+":
+            return sum(r[0] for r in ranges), sum(r[1] for r in ranges)
+        if operator == "-":
+            return (ranges[0][0] - sum(r[1] for r in ranges[1:]),
+                    ranges[0][1] - sum(r[0] for r in ranges[1:]))
+        if operator == "*":
+            return self._product_bounds(ranges)
+        # わり算の商の絶対値は被除数を超えない
+        return min(0, ranges[0][0]), max(0, ranges[0][1])
+
+    @staticmethod
+    def _product_bounds(ranges: List[Tuple[int, int]]) -> Tuple[int, int]:
+        """区間の積の最小値・最大値"""
+        low, high = 1, 1
+        for r_low, r_high in ranges:
+            corners = (low * r_low, low * r_high, high * r_low, high * r_high)
+            low, high = min(corners), max(corners)
+        return low, high
+
+    def enumerate(self, operator: str) -> Iterator[List[int]]:
+        """制約を満たすオペランドの組み合わせを辞書順に列挙する"""
+        ranges = self.operand_ranges(operator)
+        if any(low > high for low, high in ranges):
+            return
+        low, high = self.answer_bounds(operator, ranges)
+        if low > high:
+            return
+
+        if operator in ("+", "-"):
+            yield from self._enumerate_linear(operator, ranges, low, high)
+        elif operator == "*":
+            yield from self._enumerate_product(ranges, low, high)
+        elif operator == "/":
+            yield from self._enumerate_division(ranges, low, high)
+
+    def _enumerate_linear(self, operator: str, ranges: List[Tuple[int, int]],
+                          low: int, high: int) -> Iterator[List[int]]:
+        """足し算・引き算: 残りの項の寄与の範囲から各項の範囲を直接絞り込む"""
+        signs = [1] + [1 if operator == "+" else -1] * (len(ranges) - 1)
+        contributions = [sorted((s * r[0], s * r[1])) for s, r in zip(signs, ranges)]
+
+        # rest_min[k], rest_max[k]: k番目より後ろの項の寄与の合計の範囲
+        rest_min = [0] * (len(ranges) + 1)
+        rest_max = [0] * (len(ranges) + 1)
+        for k in range(len(ranges) - 1, -1, -1):
+            rest_min[k] = rest_min[k + 1] + contributions[k][0]
+            rest_max[k] = rest_max[k + 1] + contributions[k][1]
+
+        nums = [0] * len(ranges)
+
+        def walk(k: int, partial: int) -> Iterator[List[int]]:
+            if k == len(ranges):
+                yield nums.copy()
+                return
+            # partial + sign * v + (残りの寄与) が [low, high] に入りうる v だけを試す
+            need_low = low - partial - rest_max[k + 1]
+            need_high = high - partial - rest_min[k + 1]
+            if signs[k] == 1:
+                v_low, v_high = need_low, need_high
+            else:
+                v_low, v_high = -need_high, -need_low
+            v_low = max(v_low, ranges[k][0])
+            v_high = min(v_high, ranges[k][1])
+            for v in range(v_low, v_high + 1):
+                nums[k] = v
+                yield from walk(k + 1, partial + signs[k] * v)
+
+        yield from walk(0, 0)
+
+    def _enumerate_product(self, ranges: List[Tuple[int, int]],
+                           low: int, high: int) -> Iterator[List[int]]:
+        """かけ算: 残りの項の積の範囲と交わらない値を途中で打ち切る"""
+        rest_bounds = [self._product_bounds(ranges[k + 1:]) for k in range(len(ranges))]
+        nums = [0] * len(ranges)
+
+        def walk(k: int, partial: int) -> Iterator[List[int]]:
+            if k == len(ranges):
+                yield nums.copy()
+                return
+            rest_low, rest_high = rest_bounds[k]
+            for v in range(ranges[k][0], ranges[k][1] + 1):
+                value = partial * v
+                reachable = (value * rest_low, value * rest_high)
+                if min(reachable) > high or max(reachable) < low:
+                    continue
+                nums[k] = v
+                yield from walk(k + 1, value)
+
+        yield from walk(0, 1)
+
+    def _enumerate_division(self, ranges: List[Tuple[int, int]],
+                            low: int, high: int) -> Iterator[List[int]]:
+        """わり算: 除数を先に決め、商の範囲から被除数の範囲を逆算する"""
+        dividend_low, dividend_high = ranges[0]
+        exact = self.settings['div_limit'] == 1
+
+        def divisors(k: int, product: int, chosen: List[int]) -> Iterator[Tuple[int, List[int]]]:
+            if k == len(ranges):
+                yield product, chosen
+                return
+            for d in range(ranges[k][0], ranges[k][1] + 1):
+                yield from divisors(k + 1, product * d, chosen + [d])
+
+        for product, chosen in divisors(1, 1, []):
+            if exact:
+                # 被除数 = 商 × 除数の積
+                q_low = max(low, -(-dividend_low // product))
+                q_high = min(high, dividend_high // product)
+                for q in range(q_low, q_high + 1):
+                    yield [q * product] + chosen
+            else:
+                # 最後の除数以外は割り切れる必要がある（途中の余りは表せない）
+                head = product // chosen[-1]
+                start = max(dividend_low, low * product)
+                end = min(dividend_high, (high + 1) * product - 1)
+                first = start + (-start) % head
+                for dividend in range(first, end + 1, head):
+                    yield [dividend] + chosen
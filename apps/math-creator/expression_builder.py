@@ -0,0 +1,176 @@
+import random
+from fractions import Fraction
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from enumeration_engine import EnumerationEngine, term_range
+from problem_set import DISPLAY_SYMBOLS
+
+# 式の木: 葉は整数、節は (演算子, 左, 右)
+Node = Union[int, Tuple[str, Any, Any]]
+
+# 演算子の優先順位（かけ算・わり算を先に計算する）
+PRECEDENCE = {"+": 1, "-": 1, "*": 2, "/": 2}
+
+LEFT, RIGHT = 0, 1
+
+# 1つの節で分け方を選び直す回数と、1問あたりの答えの選び直し回数
+SPLIT_TRIES = 4
+TARGET_TRIES = 20
+
+
+def format_expression(node: Node) -> str:
+    """優先順位に従って、必要な所だけかっこを付けた問題文"""
+    if isinstance(node, int):
+        return str(node)
+    operator, left, right = node
+    left_text = format_expression(left)
+    right_text = format_expression(right)
+    # 左は優先順位が低い場合、右は同じ場合もかっこが必要（左から計算するため）
+    if not isinstance(left, int) and PRECEDENCE[left[0]] < PRECEDENCE[operator]:
+        left_text = f"({left_text})"
+    if not isinstance(right, int) and PRECEDENCE[right[0]] <= PRECEDENCE[operator]:
+        right_text = f"({right_text})"
+    return f"{left_text} {DISPLAY_SYMBOLS[operator]} {right_text}"
+
+
+def evaluate(node: Node) -> Fraction:
+    """式の値（正確な値）"""
+    if isinstance(node, int):
+        return Fraction(node)
+    operator, left, right = node
+    left_value, right_value = evaluate(left), evaluate(right)
+    if operator == "+":
+        return left_value + right_value
+    if operator == "-":
+        return left_value - right_value
+    if operator == "*":
+        return left_value * right_value
+    return left_value / right_value
+
+
+def leaves(node: Node) -> List[int]:
+    """式に現れる数（左から順）"""
+    if isinstance(node, int):
+        return [node]
+    return leaves(node[1]) + leaves(node[2])
+
+
+def operators_in(node: Node) -> List[str]:
+    """式に現れる演算子"""
+    if isinstance(node, int):
+        return []
+    return [node[0]] + operators_in(node[1]) + operators_in(node[2])
+
+
+class ExpressionBuilder:
+    """複数の演算子を含む式を答えから逆算して組み立てるクラス（四則混合用）
+
+    先に答えを決め、その値を「左 演算子 右」に分ける操作を項数に達するまで繰り返す。
+    分けるときに各項の数値範囲・途中の計算結果の制約（合計・積の制限、割り切れること）を
+    満たす値だけを選ぶため、作ってから捨てる候補はほとんど出ない。
+    """
+
+    def __init__(self, settings: Dict[str, Any], operators: List[str],
+                 rng: Optional[random.Random] = None):
+        self.settings = settings
+        self.operators = operators
+        self.random = rng if rng is not None else random.Random()
+        self.allow_parentheses = settings['allow_parentheses']
+        self.attempts = 0  # 答えを選んだ回数（ベンチマーク用）
+
+    def answer_range(self) -> Tuple[int, int]:
+        """答えを選ぶ範囲（2項の場合の答えの範囲を合わせたもの）"""
+        engine = EnumerationEngine(dict(self.settings, term_count=2))
+        bounds = [engine.answer_bounds(op, engine.operand_ranges(op)) for op in self.operators]
+        return min(low for low, _ in bounds), max(high for _, high in bounds)
+
+    def build(self) -> Optional[Node]:
+        """1問分の式を作る（作れなかった場合は None）"""
+        low, high = self.answer_range()
+        if low > high:
+            return None
+        for _ in range(TARGET_TRIES):
+            self.attempts += 1
+            answer = self.random.randint(low, high)
+            node = self._build(answer, self.settings['term_count'], None, None)
+            # 演算子が1種類だけの式は混合問題にしない
+            if node is not None and (len(self.operators) == 1 or len(set(operators_in(node))) > 1):
+                return node
+        return None
+
+    def _build(self, value: int, leaf_count: int, parent: Optional[str], side: Optional[int]) -> Optional[Node]:
+        if leaf_count == 1:
+            return value
+
+        operators = self._allowed_operators(parent, side)
+        self.random.shuffle(operators)
+        for operator in operators:
+            if not self._value_allowed(operator, value):
+                continue
+            left_range = term_range(self.settings, operator, 0)
+            right_range = term_range(self.settings, operator, 1)
+            if operator == "/":
+                right_range = (max(right_range[0], 1), right_range[1])  # 0で割らない
+            splits = self._splits(operator, value, left_range, right_range)
+            if not splits:
+                continue
+            for _ in range(SPLIT_TRIES):
+                left_value, right_value = self.random.choice(splits)
+                left_count = self.random.randint(1, leaf_count - 1)
+                left = self._build(left_value, left_count, operator, LEFT)
+                if left is None:
+                    continue
+                right = self._build(right_value, leaf_count - left_count, operator, RIGHT)
+                if right is None:
+                    continue
+                return (operator, left, right)
+        return None
+
+    def _allowed_operators(self, parent: Optional[str], side: Optional[int]) -> List[str]:
+        """この位置で使える演算子（かっこなしの場合は、かっこが不要になるものだけ）"""
+        if self.allow_parentheses or parent is None:
+            return list(self.operators)
+        if side == LEFT:
+            return [op for op in self.operators if PRECEDENCE[op] >= PRECEDENCE[parent]]
+        return [op for op in self.operators if PRECEDENCE[op] > PRECEDENCE[parent]]
+
+    def _value_allowed(self, operator: str, value: int) -> bool:
+        """途中の計算結果の制約（各演算の制限を、その演算の結果すべてに適用する）"""
+        if operator == "+":
+            if self.settings['add_limit'] == 1:
+                return value <= 10
+            if self.settings['add_limit'] == 2:
+                return 10 < value <= 20
+        elif operator == "-":
+            if self.settings['sub_limit'] == 1:
+                return value > 0
+        elif operator == "*":
+            if self.settings['mul_limit'] == 1:
+                return value <= 100
+        return True
+
+    @staticmethod
+    def _splits(operator: str, value: int, left_range: Tuple[int, int],
+                right_range: Tuple[int, int]) -> List[Tuple[int, int]]:
+        """「左 演算子 右 = value」となる (左, 右) のうち、両方が範囲に入るもの"""
+        (a, b), (c, d) = left_range, right_range
+        if operator == "+":
+            return [(left, value - left) for left in range(max(a, value - d), min(b, value - c) + 1)]
+        if operator == "-":
+            return [(value + right, right) for right in range(max(c, a - value), min(d, b - value) + 1)]
+        if operator == "*":
+            if value == 0:
+                return ([(0, right) for right in range(c, d + 1) if a <= 0 <= b] +
+                        [(left, 0) for left in range(a, b + 1) if left != 0 and c <= 0 <= d])
+            if value < 0:
+                return []
+            return [(left, value // left) for left in range(max(a, 1), min(b, value) + 1)
+                    if value % left == 0 and c <= value // left <= d]
+        # わり算は割り切れる組み合わせだけ（左 = 答え × 右）
+        if value < 0:
+            return []
+        if value == 0:
+            return [(0, right) for right in range(c, d + 1)] if a <= 0 <= b else []
+        low = max(c, -(-a // value))
+        high = min(d, b // value)
+        return [(value * right, right) for right in range(low, high + 1)]
@@ -1,17 +1,23 @@
 import streamlit as st
 import pandas as pd
-import numpy as np
-import random
 import sys
 import os
-from typing import List, Tuple, Dict, Any
+from typing import Dict, Any, Optional, Tuple
 
 # 現在のスクリプトのディレクトリをsys.pathに追加
 current_dir = os.path.dirname(os.path.abspath(__file__))
 if current_dir not in sys.path:
     sys.path.append(current_dir)
 
+# リポジトリ直下の共通モジュールを読み込めるようにする
+root_dir = os.path.dirname(os.path.dirname(current_dir))
+if root_dir not in sys.path:
+    sys.path.append(root_dir)
+
+from instrumentation import phase
 from output_formatter import OutputFormatter
+from problem_engine import COVERAGE_QUESTION_LIMIT, MIXED_PROBLEM_TYPES, ProblemEngine, default_settings
+from problem_set import parse_worksheet_id
 
 # ページ設定
 st.set_page_config(
@@ -21,367 +27,40 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
-class MathProblemGenerator:
-    def __init__(self):
-        self.initialize_default_settings()
+# 生成方法の表示名
+GENERATION_MODE_LABELS = {1: "通常モード", 2: "網羅モード", 3: "抽出モード", 4: "逆算モード"}
+
+# 問題数スライダーの上限
+MAX_QUESTION_COUNT = 500
+
+@st.cache_data(show_spinner=False, max_entries=64)
+def count_feasible_problems(feasibility_settings: Dict[str, Any]) -> Tuple[int, bool]:
+    """作れる問題の数 (数, 全部数えたか)（関係する設定ごとにキャッシュする）"""
+    settings = default_settings()
+    settings.update(feasibility_settings)
+    return ProblemEngine(settings).count_feasible_problems()
+
+
+class MathProblemGenerator(ProblemEngine):
+    """ProblemEngine を st.session_state の設定で動かすアダプター"""
     
-    def validate_slider_values(self):
-        """スライダーの値の整合性をチェック"""
-        settings = st.session_state.settings
-        
-        # 足し算の範囲チェック
-        if settings['add_min1'] > settings['add_max1']:
-            settings['add_max1'] = settings['add_min1']
-        if settings['add_min2'] > settings['add_max2']:
-            settings['add_max2'] = settings['add_min2']
-        
-        # 引き算の範囲チェック
-        if settings['sub_min1'] > settings['sub_max1']:
-            settings['sub_max1'] = settings['sub_min1']
-        if settings['sub_min2'] > settings['sub_max2']:
-            settings['sub_max2'] = settings['sub_min2']
-        
-        # かけ算の範囲チェック
-        if settings['mul_min1'] > settings['mul_max1']:
-            settings['mul_max1'] = settings['mul_min1']
-        if settings['mul_min2'] > settings['mul_max2']:
-            settings['mul_max2'] = settings['mul_min2']
-        
-        # わり算の範囲チェック
-        if settings['div_min1'] > settings['div_max1']:
-            settings['div_max1'] = settings['div_min1']
-        if settings['div_min2'] > settings['div_max2']:
-            settings['div_max2'] = settings['div_min2']
-        
-        # 値制限のチェック
-        if settings['value_min'] > settings['value_max']:
-            settings['value_max'] = settings['value_min']
+    def __init__(self, settings: Optional[Dict[str, Any]] = None):
+        # settings を渡した場合はセッション状態を使わない
+        super().__init__(settings)
+        self._use_session = settings is None
+        if self._use_session:
+            self.initialize_default_settings()
     
     def initialize_default_settings(self):
         """デフォルト設定の初期化"""
         if 'settings' not in st.session_state:
-            st.session_state.settings = {
-                # 基本設定
-                'problem_type': 1,  # 1:足し算, 2:引き算, 3:足し引き混合, 4:かけ算, 5:わり算, 6:四則混合
-                'randomize_order': True,
-                'question_count': 30,
-                'term_count': 2,
-                'generation_mode': 1,  # 1:通常モード, 2:網羅モード
-                
-                # 網羅設定
-                'add_coverage': 1,  # 1:通常, 2:全組合せ
-                'sub_coverage': 1,
-                'mul_coverage': 1,
-                'div_coverage': 1,
-                
-                # 数値範囲設定
-                'add_min1': 1, 'add_max1': 10,
-                'add_min2': 0, 'add_max2': 10,
-                'sub_min1': 1, 'sub_max1': 10,
-                'sub_min2': 1, 'sub_max2': 10,
-                'mul_min1': 1, 'mul_max1': 9,
-                'mul_min2': 1, 'mul_max2': 9,
-                'div_min1': 1, 'div_max1': 81,
-                'div_min2': 1, 'div_max2': 9,
-                
-                # 制約設定
-                'add_limit': 1,  # 1:10以下, 2:11-20, 3:制限なし
-                'sub_limit': 1,  # 1:正の整数, 2:負の値もOK
-                'mul_limit': 1,  # 1:100以下, 2:制限なし
-                'div_limit': 1,  # 1:余りなし, 2:余りあり
-                'value_limit_enabled': 1,  # 1:無効, 2:有効
-                'value_min': 0, 'value_max': 50,
-                
-                # 表示設定
-                'answer_display': 1,  # 1:あり, 2:なし, 3:別シート
-                'show_answer_column': True,  # 答え欄の表示
-                'font_size': 14,  # フォントサイズを14ptに固定
-                'header_text': "計算プリント",
-                
-                # 印刷設定
-                'print_margin': 20,  # 印刷時の余白（mm）
-                'print_columns': 2,  # 印刷時の列数
-                'print_show_border': True,  # 枠線の表示
-                'print_border_width': 1,  # 枠線の幅（px）
-                'print_show_grid': False,  # グリッド線の表示
-                'print_preview_mode': False,  # プレビューモード
-            }
-    
-    def get_random_number(self, min_val: int, max_val: int) -> int:
-        """指定された範囲の乱数生成"""
-        if min_val > max_val:
-            min_val, max_val = max_val, min_val
-        return random.randint(min_val, max_val)
-    
-    def generate_operands(self, operator: str) -> List[int]:
-        """各演算子のオペランド生成"""
-        nums = []
-        for i in range(self.settings['term_count']):
-            if operator == "+":
-                if i == 0:
-                    nums.append(self.get_random_number(self.settings['add_min1'], self.settings['add_max1']))
-                else:
-                    nums.append(self.get_random_number(self.settings['add_min2'], self.settings['add_max2']))
-            elif operator == "-":
-                if i == 0:
-                    nums.append(self.get_random_number(self.settings['sub_min1'], self.settings['sub_max1']))
-                else:
-                    nums.append(self.get_random_number(self.settings['sub_min2'], self.settings['sub_max2']))
-            elif operator == "*":
-                if i == 0:
-                    nums.append(self.get_random_number(self.settings['mul_min1'], self.settings['mul_max1']))
-                else:
-                    nums.append(self.get_random_number(self.settings['mul_min2'], self.settings['mul_max2']))
-            elif operator == "/":
-                if i == 0:
-                    nums.append(self.get_random_number(self.settings['div_min1'], self.settings['div_max1']))
-                else:
-                    num = self.get_random_number(self.settings['div_min2'], self.settings['div_max2'])
-                    nums.append(num if num != 0 else 1)
-        return nums
-    
-    def adjust_div_operands(self, nums: List[int], operator: str) -> List[int]:
-        """わり算の場合の被除数調整"""
-        if operator != "/" or self.settings['div_limit'] != 1:
-            return nums
-        
-        # 余りなしの場合、除数部分の積で被除数を調整
-        product = 1
-        for i in range(1, len(nums)):
-            product *= nums[i]
-        
-        multiplier = self.get_random_number(
-            max(1, self.settings['value_min'] // product),
-            self.settings['value_max'] // product
-        )
-        nums[0] = product * multiplier
-        if nums[0] == 0:
-            nums[0] = product
-        
-        return nums
-    
-    def calculate_answer(self, nums: List[int], operator: str) -> Any:
-        """計算結果の取得"""
-        answer = nums[0]
-        
-        for i in range(1, len(nums)):
-            if operator == "+":
-                answer += nums[i]
-            elif operator == "-":
-                answer -= nums[i]
-            elif operator == "*":
-                answer *= nums[i]
-            elif operator == "/":
-                if nums[i] == 0:
-                    return "ERROR"
-                elif self.settings['div_limit'] == 1:
-                    answer = answer / nums[i]
-                else:
-                    quotient = answer // nums[i]
-                    remainder = answer % nums[i]
-                    if remainder == 0:
-                        answer = quotient
-                    else:
-                        answer = f"{quotient} 余り {remainder}"
-        
-        return answer
-    
-    def is_valid_question(self, answer: Any, operator: str) -> bool:
-        """問題の妥当性チェック"""
-        if answer == "ERROR":
-            return False
-        
-        # 足し算の制約
-        if operator == "+":
-            if self.settings['add_limit'] == 1 and answer > 10:
-                return False
-            elif self.settings['add_limit'] == 2 and (answer <= 10 or answer > 20):
-                return False
-        
-        # 引き算の制約
-        elif operator == "-":
-            if self.settings['sub_limit'] == 1 and answer <= 0:
-                return False
-        
-        # かけ算の制約
-        elif operator == "*":
-            if self.settings['mul_limit'] == 1 and answer > 100:
-                return False
-        
-        # 解の値制限
-        if self.settings['value_limit_enabled'] == 2:
-            try:
-                numeric_value = float(answer)
-                if numeric_value < self.settings['value_min'] or numeric_value > self.settings['value_max']:
-                    return False
-            except (ValueError, TypeError):
-                return False
-        
-        return True
-    
-    def build_question_string(self, nums: List[int], operator: str) -> str:
-        """問題文（文字列）の生成"""
-        result = str(nums[0])
-        for i in range(1, len(nums)):
-            if operator == "+":
-                result += f" + {nums[i]}"
-            elif operator == "-":
-                result += f" - {nums[i]}"
-            elif operator == "*":
-                result += f" × {nums[i]}"
-            elif operator == "/":
-                result += f" ÷ {nums[i]}"
-        return result
-    
-    def format_vertical_equation(self, nums: List[int], operator: str) -> str:
-        """問題文生成（横書き形式）"""
-        return self.build_question_string(nums, operator)
-    
-    def generate_problems(self) -> Tuple[pd.DataFrame, pd.DataFrame]:
-        """問題生成メイン"""
-        random.seed()
-        
-        problems = []
-        answers = []
-        used_questions = set()
-        
-        # 演算子リストの決定
-        operator_map = {
-            1: ["+"],
-            2: ["-"],
-            3: ["+", "-"],
-            4: ["*"],
-            5: ["/"],
-            6: ["+", "-", "*", "/"]
-        }
-        operators = operator_map.get(self.settings['problem_type'], ["+"])
-        
-        # 網羅モードの処理
-        for operator in operators:
-            coverage_map = {
-                "+": self.settings['add_coverage'],
-                "-": self.settings['sub_coverage'],
-                "*": self.settings['mul_coverage'],
-                "/": self.settings['div_coverage']
-            }
-            
-            if coverage_map.get(operator, 1) == 2:
-                # 網羅的な全組み合わせ生成
-                min_val = self.get_min_value(operator)
-                max_val = self.get_max_value(operator)
-                combinations = self.generate_combinations(min_val, max_val)
-                
-                for combo in combinations:
-                    nums = combo.copy()
-                    nums = self.adjust_div_operands(nums, operator)
-                    answer = self.calculate_answer(nums, operator)
-                    
-                    if self.is_valid_question(answer, operator):
-                        question = self.build_question_string(nums, operator)
-                        if question not in used_questions:
-                            used_questions.add(question)
-                            problems.append({
-                                'ばんごう': len(problems) + 1,
-                                'もんだい': self.format_vertical_equation(nums, operator),
-                                'こたえ': '',  # 生徒が記入する答え欄
-                                'せいかい': answer
-                            })
-                            answers.append({
-                                'もんだいばんごう': len(answers) + 1,
-                                'せいかい': answer
-                            })
-        
-        # 通常生成モード
-        max_tries = 20000
-        try_count = 0
-        
-        while len(problems) < self.settings['question_count'] and try_count < max_tries:
-            try_count += 1
-            
-            # 演算子の選択
-            if self.settings['problem_type'] == 3:
-                operator = random.choice(["+", "-"])
-            elif self.settings['problem_type'] == 6:
-                operator = random.choice(["+", "-", "*", "/"])
-            else:
-                operator = operators[0]
-            
-            nums = self.generate_operands(operator)
-            nums = self.adjust_div_operands(nums, operator)
-            answer = self.calculate_answer(nums, operator)
-            
-            if not self.is_valid_question(answer, operator):
-                continue
-            
-            question = self.build_question_string(nums, operator)
-            if question not in used_questions:
-                used_questions.add(question)
-                problems.append({
-                    'ばんごう': len(problems) + 1,
-                    'もんだい': self.format_vertical_equation(nums, operator),
-                    'こたえ': '',  # 生徒が記入する答え欄
-                    'せいかい': answer
-                })
-                answers.append({
-                    'もんだいばんごう': len(answers) + 1,
-                    'せいかい': answer
-                })
-        
-        # 順序設定の適用
-        if self.settings['randomize_order']:
-            # ランダム順序
-            random.shuffle(problems)
-            random.shuffle(answers)
-        else:
-            # 昇順（数値順）
-            def extract_numbers(problem):
-                import re
-                numbers = re.findall(r'\d+', problem['もんだい'])
-                return [int(n) for n in numbers]
-            
-            problems.sort(key=lambda x: extract_numbers(x))
-            answers.sort(key=lambda x: extract_numbers(problems[x['もんだいばんごう']-1]))
-        
-        # 番号の再割り当て
-        for i, problem in enumerate(problems):
-            problem['ばんごう'] = i + 1
-        for i, answer in enumerate(answers):
-            answer['もんだいばんごう'] = i + 1
-        
-        return pd.DataFrame(problems), pd.DataFrame(answers)
-    
-    def get_min_value(self, operator: str) -> int:
-        """最小値取得"""
-        min_map = {
-            "+": self.settings['add_min1'],
-            "-": self.settings['sub_min1'],
-            "*": self.settings['mul_min1'],
-            "/": self.settings['div_min1']
-        }
-        return min_map.get(operator, 1)
-    
-    def get_max_value(self, operator: str) -> int:
-        """最大値取得"""
-        max_map = {
-            "+": self.settings['add_max1'],
-            "-": self.settings['sub_max1'],
-            "*": self.settings['mul_max1'],
-            "/": self.settings['div_max1']
-        }
-        return max_map.get(operator, 10)
-    
-    def generate_combinations(self, min_val: int, max_val: int) -> List[List[int]]:
-        """組み合わせ生成"""
-        combinations = []
-        for i in range(min_val, max_val + 1):
-            for j in range(min_val, max_val + 1):
-                combinations.append([i, j])
-        return combinations
+            st.session_state.settings = default_settings()
     
     @property
     def settings(self) -> Dict[str, Any]:
-        return st.session_state.settings
-
+        if self._use_session:
+            return st.session_state.settings
+        return self._settings
 
 
 def main():
@@ -422,28 +101,58 @@ def main():
         generator.settings['term_count'] = term_count
         st.caption(f"1問あたりの項数")
         
+        # 混合問題で1問に複数の演算子を使うかどうか（3項以上）
+        if problem_type in MIXED_PROBLEM_TYPES and term_count >= 3:
+            mixed_operators = st.radio(
+                "混合のしかた",
+                options=[1, 2],
+                format_func=lambda x: {1: "1問に1種類の演算", 2: "1問に複数の演算を混ぜる"}[x],
+                index=generator.settings['mixed_operators'] - 1,
+                key="mixed_operators_sidebar_radio"
+            )
+            generator.settings['mixed_operators'] = mixed_operators
+            if mixed_operators == 2:
+                generator.settings['allow_parentheses'] = st.checkbox(
+                    "かっこ（ ）を使う",
+                    value=generator.settings['allow_parentheses'],
+                    key="allow_parentheses_sidebar_checkbox"
+                )
+                st.caption("例：3 + 4 × 2、(8 - 2) ÷ 3。かけ算・わり算を先に計算する式になります（通常・逆算モードのみ）")
+        
         # 生成モード選択
         generation_mode = st.radio(
             "生成方法",
-            options=[1, 2],
-            format_func=lambda x: "通常モード" if x == 1 else "網羅モード",
+            options=[1, 2, 3, 4],
+            format_func=lambda x: GENERATION_MODE_LABELS[x],
             index=generator.settings.get('generation_mode', 1) - 1,
             key="generation_mode_sidebar_radio"
         )
         generator.settings['generation_mode'] = generation_mode
         
-        if generation_mode == 1:
+        if generation_mode in (1, 3, 4):
             # 通常の問題数設定
             question_count = st.slider(
                 "問題数",
                 min_value=10,
-                max_value=100,
-                value=generator.settings['question_count'],
+                max_value=MAX_QUESTION_COUNT,
+                value=min(generator.settings['question_count'], MAX_QUESTION_COUNT),
                 step=10,
                 key="question_count_sidebar_slider"
             )
             generator.settings['question_count'] = question_count
             st.caption(f"{generator.settings['question_count']}問生成")
+            
+            if generation_mode == 3:
+                # 抽出モードでは作れる問題数を事前に表示（設定が変わったときだけ数え直す）
+                feasible_count, complete = count_feasible_problems(generator.feasibility_settings())
+                if not complete:
+                    st.caption(f"条件を満たす問題: {feasible_count}通り以上")
+                else:
+                    st.caption(f"条件を満たす問題: 全{feasible_count}通り")
+                if complete and feasible_count < question_count:
+                    st.warning(f"⚠️ 条件を満たす問題は{feasible_count}通りしかないため、{feasible_count}問のみ生成されます。")
+            elif generation_mode == 4:
+                st.caption("答えを先に決めてから式を作ります（条件の厳しい設定でも速く作れます）")
         else:
             st.caption("全組み合わせ生成")
         
@@ -562,51 +271,119 @@ def main():
         # メインページ
         st.subheader("🎯 問題生成")
         
+        # 以前のプリントを再作成する場合はワークシートIDを指定する
+        worksheet_id_text = st.text_input(
+            "ワークシートID（再作成する場合のみ）",
+            key="worksheet_id_input",
+            help="PDFの日付の下に印字されているIDです。同じ設定で同じ問題を再作成できます。"
+        )
+        
         # 操作ボタン
         col1, col2 = st.columns(2)
         
         with col1:
             if st.button("🎯 問題生成", type="primary", use_container_width=True, key="generate_problems_main"):
+                seed = None
+                if worksheet_id_text.strip():
+                    try:
+                        seed = parse_worksheet_id(worksheet_id_text)
+                    except ValueError as e:
+                        st.error(f"❌ {e}")
+                        st.stop()
+                
                 with st.spinner("問題を生成中..."):
                     # 組み合わせ網羅モードの場合は問題数を十分大きく設定
                     if generator.settings['generation_mode'] == 2:
                         original_count = generator.settings['question_count']
-                        generator.settings['question_count'] = 10000  # 十分大きな数
+                        generator.settings['question_count'] = COVERAGE_QUESTION_LIMIT
                     
-                    problems_df, answers_df = generator.generate_problems()
+                    with phase("generation"):
+                        problem_set = generator.generate_problem_set(seed)
                     
                     # 組み合わせ網羅モードの場合は実際の生成数を設定に反映
                     if generator.settings['generation_mode'] == 2:
-                        generator.settings['question_count'] = len(problems_df)
+                        generator.settings['question_count'] = len(problem_set)
                     
-                    st.session_state.problems_df = problems_df
-                    st.session_state.answers_df = answers_df
-                    st.success(f"{len(problems_df)}問の問題が生成されました！")
+                    # セッションには軽量な問題セットだけを保持し、DataFrame は必要なときに作る
+                    st.session_state.problem_set = problem_set
+                    problems_df, answers_df = problem_set.to_frames()
+                    message = f"{len(problems_df)}問の問題が生成されました！（ワークシートID: {problem_set.worksheet_id}）"
+                    if generator.settings['generation_mode'] == 2 and generator.stats['coverage_truncated']:
+                        # 上限で打ち切った場合は「すべての組み合わせ」になっていないことを知らせる
+                        message += (f" ※組み合わせが上限の{COVERAGE_QUESTION_LIMIT}問を超えたため、"
+                                    "演算ごとに均等に分けて一部の組み合わせだけを出題しています")
+                    st.success(message)
                     
-                    # PDFも同時に生成・ダウンロード
+                    # PDFも同時に生成
                     with st.spinner("PDFを生成中..."):
-                        pdf_buffer = formatter.create_pdf(problems_df, answers_df, generator.settings)
-                        
-                        # PDFを自動ダウンロード
-                        file_name = f"{generator.settings['header_text']}_{len(problems_df)}問.pdf"
-                        href, b64_pdf = formatter.create_download_link(pdf_buffer, file_name)
-                        
-                        st.markdown(href, unsafe_allow_html=True)
-                        
-                        # 自動ダウンロードのJavaScript
-                        script = formatter.create_auto_download_script(b64_pdf, file_name)
-                        st.markdown(script, unsafe_allow_html=True)
+                        with phase("pdf_build"):
+                            pdf_buffer = formatter.create_pdf(
+                                problems_df, answers_df, generator.settings, worksheet_id=problem_set.worksheet_id
+                            )
+                        if pdf_buffer is not None:
+                            st.session_state.pdf_bytes = pdf_buffer.getvalue()
+                            st.session_state.pdf_file_name = (
+                                f"{generator.settings['header_text']}_{len(problems_df)}問_{problem_set.worksheet_id}.pdf"
+                            )
         
         with col2:
             if st.button("📊 設定をリセット", use_container_width=True, key="reset_settings_main"):
                 generator.initialize_default_settings()
                 st.rerun()
         
+        # PDFのダウンロード（再実行のたびにPDFを埋め込まず、ボタン経由で1回だけ送る）
+        if 'pdf_bytes' in st.session_state:
+            formatter.show_download_button(st.session_state.pdf_bytes, st.session_state.pdf_file_name)
+        
+        # クラス全員分の一括作成
+        with st.expander("👥 クラス一括作成", expanded=False):
+            st.write("💡 **一括作成**: 生徒ごとに異なる問題のプリントを並列で作成し、ZIPでまとめてダウンロードします。"
+                     "「生徒名,ワークシートID」と入力すると、以前と同じ問題を再作成できます。")
+            roster_text = st.text_area("生徒名（1行に1人）", key="bulk_roster_input")
+            student_count = st.number_input(
+                "人数（生徒名が空の場合）",
+                min_value=1,
+                max_value=100,
+                value=40,
+                key="bulk_student_count_input"
+            )
+            
+            if st.button("👥 一括作成", use_container_width=True, key="generate_bulk_worksheets"):
+                from bulk_worksheets import create_bulk_worksheets, parse_roster
+                
+                try:
+                    students, seeds = parse_roster(roster_text, student_count)
+                except ValueError as e:
+                    st.error(f"❌ {e}")
+                    st.stop()
+                bulk_settings = dict(generator.settings)
+                if bulk_settings['generation_mode'] == 2:
+                    bulk_settings['question_count'] = COVERAGE_QUESTION_LIMIT
+                
+                with st.spinner(f"{len(students)}人分のプリントを作成中..."), phase("bulk_build"):
+                    zip_bytes, roster = create_bulk_worksheets(
+                        bulk_settings, st.session_state.output_styles, students, seeds
+                    )
+                st.session_state.bulk_zip = zip_bytes
+                st.session_state.bulk_roster = pd.DataFrame(roster, columns=['せいと', 'ワークシートID'])
+            
+            if 'bulk_zip' in st.session_state:
+                st.download_button(
+                    "💾 ZIPをダウンロード",
+                    data=st.session_state.bulk_zip,
+                    file_name=f"{generator.settings['header_text']}_一括.zip",
+                    mime="application/zip",
+                    use_container_width=True,
+                    key="download_bulk_zip"
+                )
+                st.dataframe(st.session_state.bulk_roster, use_container_width=True, hide_index=True)
+        
         # st.markdown("---")
         
         # 問題の表示
-        if 'problems_df' in st.session_state:
-            formatter.display_problems(st.session_state.problems_df, st.session_state.answers_df, generator.settings)
+        if 'problem_set' in st.session_state:
+            problems_df, answers_df = st.session_state.problem_set.to_frames()
+            formatter.display_problems(problems_df, answers_df, generator.settings)
         else:
             # st.info("👆 上記の「問題生成」ボタンをクリックして問題を生成してください。")
             
@@ -622,7 +399,7 @@ def main():
                 st.metric("項数", f"{generator.settings['term_count']}項")
             
             with col2:
-                st.metric("生成方法", "通常モード" if generator.settings['generation_mode'] == 1 else "網羅モード")
+                st.metric("生成方法", GENERATION_MODE_LABELS[generator.settings['generation_mode']])
                 st.metric("問題数", f"{generator.settings['question_count']}問")
             
             with col3:
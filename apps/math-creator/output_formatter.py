@@ -1,114 +1,191 @@
 import streamlit as st
 import pandas as pd
 from reportlab.lib.pagesizes import A4
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
+from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, PageBreak
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.units import mm
 from reportlab.lib import colors
 from reportlab.pdfbase import pdfmetrics
 from reportlab.pdfbase.ttfonts import TTFont
 from reportlab.pdfbase.cidfonts import UnicodeCIDFont
+import copy
 import io
-import base64
 import os
+import threading
+from pdf_cache import make_cache_key, pdf_cache
 
-class OutputFormatter:
-    """問題の出力フォーマットとデザインを管理するクラス"""
+# 段組みの段と段の間隔（ポイント）と、文字サイズを自動で縮めるときの下限
+COLUMN_GAP = 12
+MIN_FONT_SIZE = 8
+
+# 利用可能な日本語フォントのリスト
+JAPANESE_CID_FONTS = [
+    'HeiseiMin-W3',      # ReportLab標準
+    'HeiseiKakuGo-W5',   # ReportLab標準（ゴシック体）
+    'MS-Mincho',         # Windows標準
+    'MS-Gothic',         # Windows標準（ゴシック体）
+    'Yu-Mincho',         # Windows Vista以降
+    'Yu-Gothic',         # Windows Vista以降（ゴシック体）
+    'Hiragino-Mincho',   # macOS標準
+    'Hiragino-Gothic',   # macOS標準（ゴシック体）
+]
+
+# PDF_EMBED_TTF=1 のとき、ローカルのTrueTypeフォントを（使用文字だけ）埋め込む
+EMBED_TTF = os.getenv("PDF_EMBED_TTF", "0") == "1"
+JAPANESE_TTF_PATHS = [
+    os.getenv("PDF_TTF_PATH", ""),
+    '/usr/share/fonts/opentype/ipaexfont-mincho/ipaexm.ttf',  # Debian/Ubuntu (fonts-ipaexfont)
+    '/usr/share/fonts/truetype/fonts-japanese-mincho.ttf',
+    '/usr/share/fonts/ipa-mincho/ipam.ttf',                   # Fedora
+    'C:/Windows/Fonts/msmincho.ttc',                          # Windows
+]
+
+# デフォルトのスタイル設定
+DEFAULT_STYLES = {
+    # PDF設定
+    'pdf_title_font_size': 16,
+    'pdf_table_font_size': 18,  # テーブルフォントサイズを14ptに固定
+    'pdf_header_font_size': 14,  # ヘッダーフォントサイズを14ptに固定
+    'pdf_margin': 20,
+    'pdf_line_spacing': 1.2,
     
-    def __init__(self):
-        self.initialize_default_styles()
-        self.setup_japanese_fonts()
+    # テーブル設定
+    'table_header_bg_color': colors.grey,
+    'table_header_text_color': colors.whitesmoke,
+    'table_body_bg_color': colors.white,  # 背景色を白に変更
+    'table_border_color': colors.black,
+    'table_border_width': 1,
     
-    def setup_japanese_fonts(self):
-        """日本語フォントの設定"""
-        import os
-        import platform
-        
-        # 利用可能な日本語フォントのリスト
-        japanese_fonts = [
-            'HeiseiMin-W3',      # ReportLab標準
-            'HeiseiKakuGo-W5',   # ReportLab標準（ゴシック体）
-            'MS-Mincho',         # Windows標準
-            'MS-Gothic',         # Windows標準（ゴシック体）
-            'Yu-Mincho',         # Windows Vista以降
-            'Yu-Gothic',         # Windows Vista以降（ゴシック体）
-            'Hiragino-Mincho',   # macOS標準
-            'Hiragino-Gothic',   # macOS標準（ゴシック体）
-        ]
-        
-        # フォントを順番に試す
-        for font_name in japanese_fonts:
+    # 表示設定
+    'show_problem_numbers': True,
+    'show_answers': True,
+    'separate_answer_sheet': False,
+    
+    # フォント設定
+    'font_family': 'HeiseiMin-W3',  # 日本語フォント（ReportLab標準）
+    'bold_font_family': 'HeiseiMin-W3',  # 日本語太字フォント
+    
+    # A4印刷用レイアウト設定（1行66ピクセル想定）
+    # A4幅: 210mm = 595.28ポイント
+    # 余白を考慮して利用可能幅: 約550ポイント
+    # 1行66ピクセル = 約50ポイント
+    'column_widths': {
+        'problem_number': 80,    # 番号列
+        'problem': 210,          # 問題列
+        'answer_column': 120,    # 答え欄
+        'answer': 100            # 解答列
+    },
+    
+    # 行の高さ設定
+    'row_height':47,            # 行の高さ（ポイント）
+    'header_row_height': 25,     # ヘッダー行の高さ（ポイント）
+}
+
+
+def default_styles():
+    """デフォルトのスタイル設定のコピーを返す"""
+    return copy.deepcopy(DEFAULT_STYLES)
+
+
+_font_lock = threading.Lock()
+_registered_fonts = {}
+
+
+def register_japanese_fonts(embed_ttf=EMBED_TTF):
+    """日本語フォントを登録し、(フォント名, 太字フォント名, エラー) を返す
+    
+    登録はプロセス全体で1回だけ行い、以降は全セッションで同じ結果を使う。
+    """
+    with _font_lock:
+        if embed_ttf not in _registered_fonts:
+            _registered_fonts[embed_ttf] = _discover_japanese_fonts(embed_ttf)
+        return _registered_fonts[embed_ttf]
+
+
+def _discover_japanese_fonts(embed_ttf):
+    """使える日本語フォントを探して登録する"""
+    # TrueTypeフォントは ReportLab が使用文字だけのサブセットにして埋め込む
+    if embed_ttf:
+        for path in JAPANESE_TTF_PATHS:
+            if not path or not os.path.exists(path):
+                continue
             try:
-                pdfmetrics.registerFont(UnicodeCIDFont(font_name))
-                self.japanese_font = font_name
-                self.japanese_bold_font = font_name
-                st.success(f"✅ 日本語フォント（{font_name}）を使用します")
-                return
-            except Exception as e:
+                pdfmetrics.registerFont(TTFont('JapaneseTTF', path))
+                return 'JapaneseTTF', 'JapaneseTTF', None
+            except Exception:
                 continue
-        
-        # すべての日本語フォントが失敗した場合
+    
+    # フォントを順番に試す
+    for font_name in JAPANESE_CID_FONTS:
         try:
-            # 最後の手段として、ReportLabのデフォルト日本語フォントを試す
-            from reportlab.pdfbase.cidfonts import UnicodeCIDFont
-            pdfmetrics.registerFont(UnicodeCIDFont('HeiseiMin-W3'))
-            self.japanese_font = 'HeiseiMin-W3'
-            self.japanese_bold_font = 'HeiseiMin-W3'
-            # st.info("ℹ️ デフォルトの日本語フォントを使用します")
+            pdfmetrics.registerFont(UnicodeCIDFont(font_name))
+            return font_name, font_name, None
         except Exception as e:
-            # 最終フォールバック: 英語フォントを使用
-            self.japanese_font = 'Helvetica'
-            self.japanese_bold_font = 'Helvetica-Bold'
-            st.warning(f"⚠️ 日本語フォントの設定に失敗しました。英語フォントを使用します。\nエラー詳細: {e}")
+            error = e
+    
+    # 最終フォールバック: 英語フォントを使用
+    return 'Helvetica', 'Helvetica-Bold', error
+
+class OutputFormatter:
+    """問題の出力フォーマットとデザインを管理するクラス"""
+    
+    def __init__(self, styles=None):
+        # styles を渡した場合はセッション状態を使わない（一括生成のワーカー用）
+        self._styles = styles
+        if styles is None:
+            self.initialize_default_styles()
+        self.setup_japanese_fonts()
+    
+    def setup_japanese_fonts(self):
+        """日本語フォントの設定（登録はプロセスで1回だけ行い、結果を共有する）"""
+        self.japanese_font, self.japanese_bold_font, error = register_japanese_fonts()
+        if error is not None:
+            st.warning(f"⚠️ 日本語フォントの設定に失敗しました。英語フォントを使用します。\nエラー詳細: {error}")
     
     def initialize_default_styles(self):
         """デフォルトのスタイル設定を初期化"""
         if 'output_styles' not in st.session_state:
-            st.session_state.output_styles = {
-                # PDF設定
-                'pdf_title_font_size': 16,
-                'pdf_table_font_size': 18,  # テーブルフォントサイズを14ptに固定
-                'pdf_header_font_size': 14,  # ヘッダーフォントサイズを14ptに固定
-                'pdf_margin': 20,
-                'pdf_line_spacing': 1.2,
-                
-                # テーブル設定
-                'table_header_bg_color': colors.grey,
-                'table_header_text_color': colors.whitesmoke,
-                'table_body_bg_color': colors.white,  # 背景色を白に変更
-                'table_border_color': colors.black,
-                'table_border_width': 1,
-                
-                # 表示設定
-                'show_problem_numbers': True,
-                'show_answers': True,
-                'separate_answer_sheet': False,
-                
-                # フォント設定
-                'font_family': 'HeiseiMin-W3',  # 日本語フォント（ReportLab標準）
-                'bold_font_family': 'HeiseiMin-W3',  # 日本語太字フォント
-                
-                # A4印刷用レイアウト設定（1行66ピクセル想定）
-                # A4幅: 210mm = 595.28ポイント
-                # 余白を考慮して利用可能幅: 約550ポイント
-                # 1行66ピクセル = 約50ポイント
-                'column_widths': {
-                    'problem_number': 80,    # 番号列
-                    'problem': 210,          # 問題列
-                    'answer_column': 120,    # 答え欄
-                    'answer': 100            # 解答列
-                },
-                
-                # 行の高さ設定
-                'row_height':47,            # 行の高さ（ポイント）
-                'header_row_height': 25,     # ヘッダー行の高さ（ポイント）
-            }
+            st.session_state.output_styles = default_styles()
+    
+    def create_pdf(self, problems_df, answers_df, settings, use_cache=True, worksheet_id=""):
+        """PDFファイルを生成する関数（同じ内容のPDFはキャッシュから返す）
+
+        worksheet_id を渡すと、ヘッダーの日付の下に印字する。
+        """
+        if not use_cache:
+            return self.build_pdf(problems_df, answers_df, settings, worksheet_id)
+        
+        # ヘッダーに印字する日時そのものをキーに含める（印字が変わるときは作り直す）
+        printed_at = self.header_datetime()
+        stamp = f"{printed_at}:{worksheet_id}"
+        key = make_cache_key(problems_df, answers_df, settings, self.styles, stamp)
+        cached = pdf_cache.get(key)
+        if cached is not None:
+            return io.BytesIO(cached)
+        
+        buffer = self.build_pdf(problems_df, answers_df, settings, worksheet_id, printed_at)
+        if buffer is not None:
+            pdf_cache.put(key, buffer.getvalue())
+        return buffer
+    
+    @staticmethod
+    def header_datetime():
+        """ヘッダーに印字する現在の日付と時間"""
+        from datetime import datetime
+        return datetime.now().strftime("%Y年%m月%d日 %H:%M")
     
-    def create_pdf(self, problems_df, answers_df, settings):
-        """PDFファイルを生成する関数"""
+    def build_pdf(self, problems_df, answers_df, settings, worksheet_id="", printed_at=None):
+        """PDFを作成する（キャッシュを使わない）
+
+        printed_at はヘッダーに印字する日時（省略すると現在の日時）。
+        """
         buffer = io.BytesIO()
-        # A4の上部と下部マージンを小さくする（デフォルトは72ポイント）
-        doc = SimpleDocTemplate(buffer, pagesize=A4, topMargin=30, bottomMargin=30, leftMargin=72, rightMargin=72)
+        # 余白は印刷設定（mm）に従う
+        margin = settings.get('print_margin', 20) * mm
+        doc = SimpleDocTemplate(buffer, pagesize=A4, topMargin=margin, bottomMargin=margin, leftMargin=margin, rightMargin=margin)
+        # フレームの内側の余白（上下左右6ポイント）を除いた描画可能領域
+        frame_width = doc.width - 12
+        frame_height = doc.height - 12
         elements = []
         
         # スタイル設定
@@ -116,7 +193,7 @@ class OutputFormatter:
         title_style = ParagraphStyle(
             'CustomTitle',
             parent=styles['Heading1'],
-            fontSize=st.session_state.output_styles['pdf_title_font_size'],
+            fontSize=self.styles['pdf_title_font_size'],
             spaceAfter=10,  # タイトルの後の余白を小さく
             spaceBefore=0,  # タイトルの前の余白を0に
             alignment=0,  # 左揃え
@@ -134,9 +211,11 @@ class OutputFormatter:
             fontName=self.japanese_font
         )
         
-        # 現在の日付と時間を取得
-        from datetime import datetime
-        current_datetime = datetime.now().strftime("%Y年%m月%d日 %H:%M")
+        # 日付と時間（キャッシュのキーと同じ文字列を印字する）
+        current_datetime = printed_at if printed_at is not None else self.header_datetime()
+        # ワークシートIDがあれば日付の下に印字する（IDと設定から同じプリントを再作成できる）
+        if worksheet_id:
+            current_datetime += f"<br/>ID: {worksheet_id}"
         
         # タイトルと日付を2列で表示
         title_table_data = [
@@ -144,8 +223,8 @@ class OutputFormatter:
              Paragraph(current_datetime, datetime_style)]
         ]
         
-        # タイトルテーブルの列幅設定（左側にタイトル、右側に日付）
-        title_col_widths = [400, 150]  # タイトル用に400ポイント、日付用に150ポイント
+        # タイトルテーブルの列幅設定（左側にタイトル、右側に日付150ポイント）
+        title_col_widths = [frame_width - 150, 150]
         
         title_table = Table(title_table_data, colWidths=title_col_widths)
         title_table.setStyle(TableStyle([
@@ -162,154 +241,175 @@ class OutputFormatter:
         
         elements.append(title_table)
         elements.append(Spacer(1, 5))  # タイトルとテーブルの間隔を小さく
+        title_height = title_table.wrap(frame_width, frame_height)[1] + 5
         
-        # 問題テーブルの作成
-        if settings['answer_display'] == 2:
-            # 解答なしの場合
-            if settings.get('show_answer_column', True):
-                table_data = [['ばんごう', 'もんだい', 'こたえ']]
-                for _, row in problems_df.iterrows():
-                    # カラム名の存在確認
-                    if 'ばんごう' in row and 'もんだい' in row and 'こたえ' in row:
-                        table_data.append([str(row['ばんごう']), str(row['もんだい']), str(row['こたえ'])])
-                    else:
-                        st.error(f"カラム名が一致しません。期待: ['ばんごう', 'もんだい', 'こたえ'], 実際: {list(row.index)}")
-                        return None
-                # 列幅設定: 番号、問題、答え欄
-                col_widths = [
-                    st.session_state.output_styles['column_widths']['problem_number'],
-                    st.session_state.output_styles['column_widths']['problem'],
-                    st.session_state.output_styles['column_widths']['answer_column']
-                ]
-            else:
-                table_data = [['ばんごう', 'もんだい']]
-                for _, row in problems_df.iterrows():
-                    # カラム名の存在確認
-                    if 'ばんごう' in row and 'もんだい' in row:
-                        table_data.append([str(row['ばんごう']), str(row['もんだい'])])
-                    else:
-                        st.error(f"カラム名が一致しません。期待: ['ばんごう', 'もんだい'], 実際: {list(row.index)}")
-                        return None
-                # 列幅設定: 番号、問題
-                col_widths = [
-                    st.session_state.output_styles['column_widths']['problem_number'],
-                    st.session_state.output_styles['column_widths']['problem'] + st.session_state.output_styles['column_widths']['answer_column']
-                ]
+        # 問題テーブルの作成（表示する列と列幅を決めてから、列単位でまとめて文字列化）
+        widths = self.styles['column_widths']
+        show_answer_column = settings.get('show_answer_column', True)
+        columns = ['ばんごう', 'もんだい']
+        col_widths = [widths['problem_number'], widths['problem']]
+        if show_answer_column:
+            columns.append('こたえ')
+            col_widths.append(widths['answer_column'])
         else:
-            # 解答ありの場合
-            if settings.get('show_answer_column', True):
-                table_data = [['ばんごう', 'もんだい', 'こたえ', 'せいかい']]
-                for _, row in problems_df.iterrows():
-                    # カラム名の存在確認
-                    if 'ばんごう' in row and 'もんだい' in row and 'こたえ' in row and 'せいかい' in row:
-                        table_data.append([str(row['ばんごう']), str(row['もんだい']), str(row['こたえ']), str(row['せいかい'])])
-                    else:
-                        st.error(f"カラム名が一致しません。期待: ['ばんごう', 'もんだい', 'こたえ', 'せいかい'], 実際: {list(row.index)}")
-                        return None
-                # 列幅設定: 番号、問題、答え欄、解答
-                col_widths = [
-                    st.session_state.output_styles['column_widths']['problem_number'],
-                    st.session_state.output_styles['column_widths']['problem'],
-                    st.session_state.output_styles['column_widths']['answer_column'],
-                    st.session_state.output_styles['column_widths']['answer']
-                ]
-            else:
-                table_data = [['ばんごう', 'もんだい', 'せいかい']]
-                for _, row in problems_df.iterrows():
-                    # カラム名の存在確認
-                    if 'ばんごう' in row and 'もんだい' in row and 'せいかい' in row:
-                        table_data.append([str(row['ばんごう']), str(row['もんだい']), str(row['せいかい'])])
-                    else:
-                        st.error(f"カラム名が一致しません。期待: ['ばんごう', 'もんだい', 'せいかい'], 実際: {list(row.index)}")
-                        return None
-                # 列幅設定: 番号、問題、解答
-                col_widths = [
-                    st.session_state.output_styles['column_widths']['problem_number'],
-                    st.session_state.output_styles['column_widths']['problem'] + st.session_state.output_styles['column_widths']['answer_column'],
-                    st.session_state.output_styles['column_widths']['answer']
-                ]
+            # 答え欄がない場合は問題列を広げる
+            col_widths[1] += widths['answer_column']
+        if settings['answer_display'] != 2:
+            columns.append('せいかい')
+            col_widths.append(widths['answer'])
         
-        # テーブル作成（列幅を指定）
-        table = Table(table_data, colWidths=col_widths)
-        table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), st.session_state.output_styles['table_header_bg_color']),
-            ('TEXTCOLOR', (0, 0), (-1, 0), st.session_state.output_styles['table_header_text_color']),
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('FONTNAME', (0, 0), (-1, 0), self.japanese_font),  # 日本語フォントを使用
-            ('FONTSIZE', (0, 0), (-1, 0), st.session_state.output_styles['pdf_header_font_size']),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-            ('BACKGROUND', (0, 1), (-1, -1), st.session_state.output_styles['table_body_bg_color']),
-            ('GRID', (0, 0), (-1, -1), st.session_state.output_styles['table_border_width'], st.session_state.output_styles['table_border_color']),
-            ('FONTSIZE', (0, 1), (-1, -1), st.session_state.output_styles['pdf_table_font_size']),
-            ('FONTNAME', (0, 1), (-1, -1), self.japanese_font),  # 日本語フォントを使用
-            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-            # 行の高さ設定
-            ('LEFTPADDING', (0, 0), (-1, -1), 6),
-            ('RIGHTPADDING', (0, 0), (-1, -1), 6),
-            ('TOPPADDING', (0, 0), (-1, 0), st.session_state.output_styles['header_row_height'] // 2 - 6),  # ヘッダー行の高さ
-            ('BOTTOMPADDING', (0, 0), (-1, 0), st.session_state.output_styles['header_row_height'] // 2 - 6),
-            ('TOPPADDING', (0, 1), (-1, -1), st.session_state.output_styles['row_height'] // 2 - 6),  # 通常行の高さ
-            ('BOTTOMPADDING', (0, 1), (-1, -1), st.session_state.output_styles['row_height'] // 2 - 6),
-        ]))
+        table_data = self.build_table_data(problems_df, columns)
+        if table_data is None:
+            return None
         
-        elements.append(table)
-        elements.append(Spacer(1, 10))  # テーブル下の余白を小さく
+        # 印刷設定の列数で段組みして配置
+        elements.extend(self.layout_columns(
+            table_data, col_widths, settings, frame_width,
+            first_page_height=frame_height - title_height,
+            page_height=frame_height
+        ))
         
         # 解答が別シートの場合
         if settings['answer_display'] == 3 and answers_df is not None:
             # 改ページ
-            elements.append(Spacer(1, 15))  # 改ページ前の余白を小さく
+            elements.append(PageBreak())
             
             # 解答タイトル
             answer_title = Paragraph("解答", title_style)
             elements.append(answer_title)
-            elements.append(Spacer(1, 10))
+            answer_title_height = answer_title.wrap(frame_width, frame_height)[1] + title_style.spaceAfter
             
             # 解答テーブル
-            answer_data = [['もんだいばんごう', 'せいかい']]
-            for _, row in answers_df.iterrows():
-                # カラム名の存在確認
-                if 'もんだいばんごう' in row and 'せいかい' in row:
-                    answer_data.append([str(row['もんだいばんごう']), str(row['せいかい'])])
-                else:
-                    st.error(f"解答テーブルのカラム名が一致しません。期待: ['もんだいばんごう', 'せいかい'], 実際: {list(row.index)}")
-                    return None
+            answer_data = self.build_table_data(answers_df, ['もんだいばんごう', 'せいかい'], table_name="解答テーブル")
+            if answer_data is None:
+                return None
             
             # 解答テーブルの列幅設定
             answer_col_widths = [
-                st.session_state.output_styles['column_widths']['problem_number'],
-                st.session_state.output_styles['column_widths']['answer']
+                self.styles['column_widths']['problem_number'],
+                self.styles['column_widths']['answer']
             ]
             
-            answer_table = Table(answer_data, colWidths=answer_col_widths)
-            answer_table.setStyle(TableStyle([
-                ('BACKGROUND', (0, 0), (-1, 0), st.session_state.output_styles['table_header_bg_color']),
-                ('TEXTCOLOR', (0, 0), (-1, 0), st.session_state.output_styles['table_header_text_color']),
-                ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                ('FONTNAME', (0, 0), (-1, 0), self.japanese_font),  # 日本語フォントを使用
-                ('FONTSIZE', (0, 0), (-1, 0), st.session_state.output_styles['pdf_header_font_size']),
-                ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-                ('BACKGROUND', (0, 1), (-1, -1), st.session_state.output_styles['table_body_bg_color']),
-                ('GRID', (0, 0), (-1, -1), st.session_state.output_styles['table_border_width'], st.session_state.output_styles['table_border_color']),
-                ('FONTSIZE', (0, 1), (-1, -1), st.session_state.output_styles['pdf_table_font_size']),
-                ('FONTNAME', (0, 1), (-1, -1), self.japanese_font),  # 日本語フォントを使用
-                ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-                # 行の高さ設定
-                ('LEFTPADDING', (0, 0), (-1, -1), 6),
-                ('RIGHTPADDING', (0, 0), (-1, -1), 6),
-                ('TOPPADDING', (0, 0), (-1, 0), st.session_state.output_styles['header_row_height'] // 2 - 6),  # ヘッダー行の高さ
-                ('BOTTOMPADDING', (0, 0), (-1, 0), st.session_state.output_styles['header_row_height'] // 2 - 6),
-                ('TOPPADDING', (0, 1), (-1, -1), st.session_state.output_styles['row_height'] // 2 - 6),  # 通常行の高さ
-                ('BOTTOMPADDING', (0, 1), (-1, -1), st.session_state.output_styles['row_height'] // 2 - 6),
-            ]))
-            
-            elements.append(answer_table)
+            elements.extend(self.layout_columns(
+                answer_data, answer_col_widths, settings, frame_width,
+                first_page_height=frame_height - answer_title_height,
+                page_height=frame_height
+            ))
         
         # PDF生成
         doc.build(elements)
         buffer.seek(0)
         return buffer
     
+    def layout_columns(self, table_data, col_widths, settings, width, first_page_height, page_height):
+        """表を印刷設定の列数（print_columns）で段組みし、ページごとに並べる関数
+        
+        行の高さと列幅から1段に入る行数を求め、1段目→2段目→…→次のページの順に流し込む。
+        """
+        columns = max(1, int(settings.get('print_columns', 1)))
+        gap = COLUMN_GAP if columns > 1 else 0
+        column_width = (width - gap * (columns - 1)) / columns
+        
+        # 1段の幅に収まるよう列幅を縮小し、縮小した列に合わせて文字サイズを決める
+        scale = min(1, column_width / sum(col_widths))
+        col_widths = [w * scale for w in col_widths]
+        header, rows = table_data[0], table_data[1:]
+        header_sizes = self.fit_font_sizes([header], col_widths, self.styles['pdf_header_font_size'])
+        body_sizes = self.fit_font_sizes(rows, col_widths, self.styles['pdf_table_font_size'])
+        
+        row_height = self.styles['row_height']
+        header_height = self.styles['header_row_height']
+        
+        elements = []
+        start = 0
+        height = first_page_height
+        while True:
+            # このページの1段に入る行数
+            rows_per_column = max(1, int((height - header_height) // row_height))
+            blocks = []
+            for _ in range(columns):
+                chunk = rows[start:start + rows_per_column]
+                if blocks and not chunk:
+                    break
+                blocks.append(self.create_column_table(
+                    [header] + chunk, col_widths, header_sizes, body_sizes, settings
+                ))
+                start += len(chunk)
+            
+            if len(blocks) == 1:
+                elements.append(blocks[0])
+            else:
+                block_widths = [column_width + gap] * (len(blocks) - 1) + [column_width]
+                page_table = Table([blocks], colWidths=block_widths, hAlign='LEFT')
+                page_table.setStyle(TableStyle([
+                    ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+                    ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+                    ('LEFTPADDING', (0, 0), (-1, -1), 0),
+                    ('RIGHTPADDING', (0, 0), (-1, -1), 0),
+                    ('TOPPADDING', (0, 0), (-1, -1), 0),
+                    ('BOTTOMPADDING', (0, 0), (-1, -1), 0),
+                ]))
+                elements.append(page_table)
+            
+            if start >= len(rows):
+                return elements
+            elements.append(PageBreak())
+            height = page_height
+    
+    def fit_font_sizes(self, rows, col_widths, max_size):
+        """各列の最も長い文字列がセルに収まる文字サイズ（列ごと、max_size以下）"""
+        sizes = []
+        for i, col_width in enumerate(col_widths):
+            widest = max((pdfmetrics.stringWidth(row[i], self.japanese_font, 1) for row in rows), default=0)
+            size = max_size
+            if widest > 0:
+                size = min(max_size, (col_width - 12) / widest)
+            sizes.append(max(MIN_FONT_SIZE, int(size)))
+        return sizes
+    
+    def create_column_table(self, table_data, col_widths, header_sizes, body_sizes, settings):
+        """1段分の表を作成する関数（行の高さは設定値で固定）"""
+        row_heights = [self.styles['header_row_height']] + [self.styles['row_height']] * (len(table_data) - 1)
+        table = Table(table_data, colWidths=col_widths, rowHeights=row_heights, hAlign='LEFT')
+        
+        border_width = self.styles['table_border_width']
+        border_color = self.styles['table_border_color']
+        commands = [
+            ('BACKGROUND', (0, 0), (-1, 0), self.styles['table_header_bg_color']),
+            ('TEXTCOLOR', (0, 0), (-1, 0), self.styles['table_header_text_color']),
+            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+            ('FONTNAME', (0, 0), (-1, -1), self.japanese_font),  # 日本語フォントを使用
+            ('BACKGROUND', (0, 1), (-1, -1), self.styles['table_body_bg_color']),
+            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+            ('LEFTPADDING', (0, 0), (-1, -1), 6),
+            ('RIGHTPADDING', (0, 0), (-1, -1), 6),
+            ('TOPPADDING', (0, 0), (-1, -1), 0),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 0),
+        ]
+        for i, (header_size, body_size) in enumerate(zip(header_sizes, body_sizes)):
+            commands.append(('FONTSIZE', (i, 0), (i, 0), header_size))
+            commands.append(('FONTSIZE', (i, 1), (i, -1), body_size))
+        
+        # 枠線（外枠と見出しの下線）とグリッド線（内側の線）
+        if settings.get('print_show_border', True):
+            commands.append(('BOX', (0, 0), (-1, -1), border_width, border_color))
+            commands.append(('LINEBELOW', (0, 0), (-1, 0), border_width, border_color))
+        if settings.get('print_show_grid', True):
+            commands.append(('INNERGRID', (0, 0), (-1, -1), border_width, border_color))
+        
+        table.setStyle(TableStyle(commands))
+        return table
+    
+    def build_table_data(self, df, columns, table_name="問題テーブル"):
+        """DataFrame から指定列だけを取り出し、見出し行付きの文字列の表にする関数"""
+        missing = [column for column in columns if column not in df.columns]
+        if missing:
+            st.error(f"{table_name}のカラム名が一致しません。期待: {columns}, 実際: {list(df.columns)}")
+            return None
+        
+        body = df[columns].astype(str).values.tolist()
+        return [list(columns)] + body
+    
     def display_problems(self, problems_df, answers_df, settings):
         """問題を画面に表示する関数"""
         # st.markdown("---")
@@ -372,29 +472,19 @@ class OutputFormatter:
                 hide_index=True
             )
     
-    def create_download_link(self, pdf_buffer, file_name):
-        """ダウンロードリンクを作成する関数"""
-        pdf_data = pdf_buffer.getvalue()
-        b64_pdf = base64.b64encode(pdf_data).decode()
-        href = f'<a href="data:application/pdf;base64,{b64_pdf}" download="{file_name}" target="_blank">💾 PDFをダウンロード</a>'
-        return href, b64_pdf
-    
-    def create_auto_download_script(self, b64_pdf, file_name):
-        """自動ダウンロードスクリプトを作成する関数"""
-        script = f"""
-        <script>
-        setTimeout(function() {{
-            var link = document.createElement('a');
-            link.href = 'data:application/pdf;base64,{b64_pdf}';
-            link.download = '{file_name}';
-            document.body.appendChild(link);
-            link.click();
-            document.body.removeChild(link);
-        }}, 1000);
-        </script>
-        """
-        return script
+    def show_download_button(self, pdf_bytes, file_name):
+        """PDFのダウンロードボタンを表示する関数（base64に変換せずバイナリのまま送信）"""
+        st.download_button(
+            "💾 PDFをダウンロード",
+            data=pdf_bytes,
+            file_name=file_name,
+            mime="application/pdf",
+            use_container_width=True,
+            key="download_pdf"
+        )
     
     @property
     def styles(self):
+        if self._styles is not None:
+            return self._styles
         return st.session_state.output_styles 
\ No newline at end of file
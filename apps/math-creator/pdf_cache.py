@@ -0,0 +1,128 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+import pandas as pd
+
+# 環境変数で容量と保存先を変更できる（PDF_CACHE_DIR が空ならディスクには保存しない）
+DEFAULT_MAX_BYTES = int(os.getenv("PDF_CACHE_MAX_BYTES", 64 * 1024 * 1024))
+DEFAULT_DISK_MAX_BYTES = int(os.getenv("PDF_CACHE_DISK_MAX_BYTES", 512 * 1024 * 1024))
+DEFAULT_CACHE_DIR = os.getenv("PDF_CACHE_DIR", "")
+
+
+def make_cache_key(problems_df: pd.DataFrame, answers_df: Optional[pd.DataFrame],
+                   settings: Dict[str, Any], styles: Dict[str, Any], stamp: str = "") -> str:
+    """問題セット・設定・スタイルの内容から決まるキー（SHA-256）"""
+    digest = hashlib.sha256()
+    for df in (problems_df, answers_df):
+        if df is None:
+            digest.update(b"<none>")
+            continue
+        digest.update(json.dumps(list(map(str, df.columns)), ensure_ascii=False).encode())
+        digest.update(pd.util.hash_pandas_object(df.astype(str), index=True).values.tobytes())
+    # reportlab の Color などは repr で文字列化する
+    digest.update(json.dumps(settings, sort_keys=True, ensure_ascii=False, default=repr).encode())
+    digest.update(json.dumps(styles, sort_keys=True, ensure_ascii=False, default=repr).encode())
+    digest.update(stamp.encode())
+    return digest.hexdigest()
+
+
+class PdfCache:
+    """作成済みPDFのLRUキャッシュ（メモリ＋任意でディスク）
+
+    メモリ上の合計サイズが max_bytes を超えると、最も長く使われていないものから削除する。
+    cache_dir を指定するとディスクにも保存し、disk_max_bytes を超えた分は古いものから削除する。
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES, cache_dir: str = DEFAULT_CACHE_DIR,
+                 disk_max_bytes: int = DEFAULT_DISK_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.disk_max_bytes = disk_max_bytes
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        self._entries: "OrderedDict[str, bytes]" = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[bytes]:
+        """キャッシュからPDFを取り出す（なければ None）"""
+        with self._lock:
+            data = self._entries.get(key)
+            if data is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return data
+
+        data = self._read_disk(key)
+        with self._lock:
+            if data is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._store_memory(key, data)
+        return data
+
+    def put(self, key: str, data: bytes):
+        """PDFをキャッシュに保存する"""
+        with self._lock:
+            self._store_memory(key, data)
+        self._write_disk(key, data)
+
+    def clear(self):
+        """メモリ上のキャッシュを空にする"""
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def _store_memory(self, key: str, data: bytes):
+        if len(data) > self.max_bytes:
+            return
+        if key in self._entries:
+            self._size -= len(self._entries.pop(key))
+        self._entries[key] = data
+        self._size += len(data)
+        while self._size > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._size -= len(evicted)
+
+    def _read_disk(self, key: str) -> Optional[bytes]:
+        if self.cache_dir is None:
+            return None
+        path = self.cache_dir / f"{key}.pdf"
+        try:
+            data = path.read_bytes()
+            os.utime(path)  # 最終利用時刻を更新（LRU用）
+            return data
+        except OSError:
+            return None
+
+    def _write_disk(self, key: str, data: bytes):
+        if self.cache_dir is None:
+            return
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            path = self.cache_dir / f"{key}.pdf"
+            tmp_path = path.with_suffix(".tmp")
+            tmp_path.write_bytes(data)
+            tmp_path.replace(path)
+            self._evict_disk()
+        except OSError:
+            pass
+
+    def _evict_disk(self):
+        files = sorted(self.cache_dir.glob("*.pdf"), key=lambda p: p.stat().st_mtime)
+        total = sum(p.stat().st_size for p in files)
+        for path in files:
+            if total <= self.disk_max_bytes:
+                break
+            total -= path.stat().st_size
+            path.unlink(missing_ok=True)
+
+
+# プロセス内の全セッションで共有するキャッシュ
+pdf_cache = PdfCache()
@@ -0,0 +1,502 @@
+import copy
+import random
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from answer import Answer, compute_answer
+from answer_first import AnswerFirstBuilder
+from batch_generator import BatchGenerator, canonical_key, quotient_range
+from enumeration_engine import RANGE_PREFIX, EnumerationEngine, term_range
+from expression_builder import ExpressionBuilder, evaluate, format_expression, leaves
+from problem_set import ProblemSet, format_question
+from seed_id import new_seed
+
+# デフォルト設定
+DEFAULT_SETTINGS = {
+    # 基本設定
+    'problem_type': 1,  # 1:足し算, 2:引き算, 3:足し引き混合, 4:かけ算, 5:わり算, 6:四則混合
+    'randomize_order': True,
+    'question_count': 30,
+    'term_count': 2,
+    'generation_mode': 1,  # 1:通常モード, 2:網羅モード, 3:抽出モード, 4:逆算モード
+    
+    # 網羅設定
+    'add_coverage': 1,  # 1:通常, 2:全組合せ
+    'sub_coverage': 1,
+    'mul_coverage': 1,
+    'div_coverage': 1,
+    
+    # 数値範囲設定
+    'add_min1': 1, 'add_max1': 10,
+    'add_min2': 0, 'add_max2': 10,
+    'sub_min1': 1, 'sub_max1': 10,
+    'sub_min2': 1, 'sub_max2': 10,
+    'mul_min1': 1, 'mul_max1': 9,
+    'mul_min2': 1, 'mul_max2': 9,
+    'div_min1': 1, 'div_max1': 81,
+    'div_min2': 1, 'div_max2': 9,
+    # 3項目以降の数値範囲（初期値は2項目と同じ）
+    'add_min3': 0, 'add_max3': 10, 'add_min4': 0, 'add_max4': 10, 'add_min5': 0, 'add_max5': 10,
+    'sub_min3': 1, 'sub_max3': 10, 'sub_min4': 1, 'sub_max4': 10, 'sub_min5': 1, 'sub_max5': 10,
+    'mul_min3': 1, 'mul_max3': 9, 'mul_min4': 1, 'mul_max4': 9, 'mul_min5': 1, 'mul_max5': 9,
+    'div_min3': 1, 'div_max3': 9, 'div_min4': 1, 'div_max4': 9, 'div_min5': 1, 'div_max5': 9,
+    
+    # 制約設定
+    'add_limit': 1,  # 1:10以下, 2:11-20, 3:制限なし
+    'sub_limit': 1,  # 1:正の整数, 2:負の値もOK
+    'mul_limit': 1,  # 1:100以下, 2:制限なし
+    'div_limit': 1,  # 1:余りなし, 2:余りあり
+    'value_limit_enabled': 1,  # 1:無効, 2:有効
+    'value_min': 0, 'value_max': 50,
+    'duplicate_mode': 1,  # 1:同じ式のみ, 2:数の順番の入れかえも重複
+    'mixed_operators': 1,  # 混合問題で 1:1問に1種類の演算, 2:1問に複数の演算を混ぜる
+    'allow_parentheses': False,  # 演算を混ぜた式でかっこを使うか
+    
+    # 表示設定
+    'answer_display': 1,  # 1:あり, 2:なし, 3:別シート
+    'show_answer_column': True,  # 答え欄の表示
+    'font_size': 14,  # フォントサイズを14ptに固定
+    'header_text': "計算プリント",
+    
+    # 印刷設定
+    'print_margin': 20,  # 印刷時の余白（mm）
+    'print_columns': 2,  # 印刷時の列数
+    'print_show_border': True,  # 枠線の表示
+    'print_border_width': 1,  # 枠線の幅（px）
+    'print_show_grid': True,  # グリッド線の表示
+    'print_preview_mode': False,  # プレビューモード
+}
+
+# 問題形式ごとの演算子
+OPERATOR_MAP = {
+    1: ["+"],
+    2: ["-"],
+    3: ["+", "-"],
+    4: ["*"],
+    5: ["/"],
+    6: ["+", "-", "*", "/"]
+}
+
+# 1問に複数の演算を混ぜられる問題形式（足し引き混合・四則混合）
+MIXED_PROBLEM_TYPES = (3, 6)
+
+# 通常モードの一括生成で1回に引く候補数と、候補数の上限
+BATCH_SIZE = 4096
+MAX_CANDIDATES = 500000
+
+# 答えから組み立てる生成（混合式・逆算モード）で、新しい問題が作れない状態がこの回数続いたら打ち切る
+MAX_CONSECUTIVE_FAILURES = 50
+
+# 抽出モードなどで全組み合わせを列挙するときに調べる組み合わせ数の上限
+# （これを超える設定では列挙をやめ、通常モードと同じ一括生成で重複なしに抽出する）
+ENUMERATION_LIMIT = 20000
+
+# 組み合わせ網羅モードで出題する問題数の上限（演算子ごとに分け合う）
+COVERAGE_QUESTION_LIMIT = 10000
+
+# 作れる問題の数を左右する設定（数値範囲のキーは別に追加する）
+FEASIBILITY_KEYS = ('problem_type', 'term_count', 'duplicate_mode', 'add_limit', 'sub_limit', 'mul_limit',
+                    'div_limit', 'value_limit_enabled', 'value_min', 'value_max')
+
+
+class EnumerationLimitExceeded(Exception):
+    """列挙する組み合わせが上限を超えた"""
+
+
+def default_settings() -> Dict[str, Any]:
+    """デフォルト設定のコピーを返す"""
+    return copy.deepcopy(DEFAULT_SETTINGS)
+
+
+def split_quota(counts: Dict[str, int], total: int) -> Dict[str, int]:
+    """total 問を演算子ごとにできるだけ均等に割り当てる
+
+    作れる数が均等な取り分より少ない演算子は全部を使い、余った分をほかの演算子で分け合う。
+    """
+    quotas = {}
+    remaining = total
+    for i, (operator, count) in enumerate(sorted(counts.items(), key=lambda item: item[1])):
+        quotas[operator] = min(count, remaining // (len(counts) - i))
+        remaining -= quotas[operator]
+    return quotas
+
+
+class ProblemEngine:
+    """問題生成の中核（Streamlitに依存しない）
+
+    設定を辞書で受け取り、問題と解答の DataFrame を返す。
+    一括生成のワーカーやベンチマークからはこのクラスを直接使う。
+    """
+
+    def __init__(self, settings: Optional[Dict[str, Any]] = None):
+        self._settings = settings if settings is not None else default_settings()
+        # 乱数はインスタンスごとに持つ（同じプロセスの他のセッションと干渉しない）
+        self.random = random.Random()
+        # 直近の generate_problems で調べた候補数と採用数（ベンチマーク用）
+        self.stats = {'candidates': 0, 'accepted': 0, 'coverage_truncated': False}
+    
+    def validate_slider_values(self):
+        """スライダーの値の整合性をチェック"""
+        settings = self.settings
+        
+        # 足し算の範囲チェック
+        if settings['add_min1'] > settings['add_max1']:
+            settings['add_max1'] = settings['add_min1']
+        if settings['add_min2'] > settings['add_max2']:
+            settings['add_max2'] = settings['add_min2']
+        
+        # 引き算の範囲チェック
+        if settings['sub_min1'] > settings['sub_max1']:
+            settings['sub_max1'] = settings['sub_min1']
+        if settings['sub_min2'] > settings['sub_max2']:
+            settings['sub_max2'] = settings['sub_min2']
+        
+        # かけ算の範囲チェック
+        if settings['mul_min1'] > settings['mul_max1']:
+            settings['mul_max1'] = settings['mul_min1']
+        if settings['mul_min2'] > settings['mul_max2']:
+            settings['mul_max2'] = settings['mul_min2']
+        
+        # わり算の範囲チェック
+        if settings['div_min1'] > settings['div_max1']:
+            settings['div_max1'] = settings['div_min1']
+        if settings['div_min2'] > settings['div_max2']:
+            settings['div_max2'] = settings['div_min2']
+        
+        # 3項目以降の範囲チェック
+        for prefix in RANGE_PREFIX.values():
+            for number in range(3, 6):
+                min_key, max_key = f'{prefix}_min{number}', f'{prefix}_max{number}'
+                if min_key in settings and settings[min_key] > settings[max_key]:
+                    settings[max_key] = settings[min_key]
+        
+        # 値制限のチェック
+        if settings['value_min'] > settings['value_max']:
+            settings['value_max'] = settings['value_min']
+    
+    def get_random_number(self, min_val: int, max_val: int) -> int:
+        """指定された範囲の乱数生成"""
+        if min_val > max_val:
+            min_val, max_val = max_val, min_val
+        return self.random.randint(min_val, max_val)
+    
+    def generate_operands(self, operator: str) -> List[int]:
+        """各演算子のオペランド生成（各項はそれぞれの数値範囲から選ぶ）"""
+        nums = []
+        for i in range(self.settings['term_count']):
+            num = self.get_random_number(*term_range(self.settings, operator, i))
+            if operator == "/" and i > 0 and num == 0:
+                num = 1
+            nums.append(num)
+        return nums
+    
+    def adjust_div_operands(self, nums: List[int], operator: str) -> List[int]:
+        """わり算の場合の被除数調整（余りなしの場合、被除数を除数部分の積の倍数にする）
+
+        商は被除数の範囲（div_min1～div_max1）に収まるものから選び、解の値制限が有効なら
+        その範囲にも収める。該当する商がない場合は調整しない。
+        """
+        if operator != "/" or self.settings['div_limit'] != 1:
+            return nums
+        
+        product = 1
+        for i in range(1, len(nums)):
+            product *= nums[i]
+        
+        low, high = map(int, quotient_range(self.settings, product))
+        if low <= high:
+            nums[0] = product * self.get_random_number(low, high)
+        return nums
+    
+    def calculate_answer(self, nums: List[int], operator: str) -> Optional[Answer]:
+        """計算結果の取得（計算できない式は None）"""
+        return compute_answer(nums, operator, exact_division=self.settings['div_limit'] == 1)
+    
+    def is_valid_question(self, answer: Optional[Answer], operator: str) -> bool:
+        """問題の妥当性チェック"""
+        if answer is None:
+            return False
+        
+        # 足し算の制約
+        if operator == "+":
+            if self.settings['add_limit'] == 1 and answer.value > 10:
+                return False
+            elif self.settings['add_limit'] == 2 and (answer.value <= 10 or answer.value > 20):
+                return False
+        
+        # 引き算の制約
+        elif operator == "-":
+            if self.settings['sub_limit'] == 1 and answer.value <= 0:
+                return False
+        
+        # かけ算の制約
+        elif operator == "*":
+            if self.settings['mul_limit'] == 1 and answer.value > 100:
+                return False
+        
+        # わり算の制約（余りなしの場合は割り切れること）
+        elif operator == "/":
+            if self.settings['div_limit'] == 1 and not answer.is_integer:
+                return False
+        
+        # 解の値制限（余りありのわり算は商で判定）
+        if self.settings['value_limit_enabled'] == 2:
+            if answer.value < self.settings['value_min'] or answer.value > self.settings['value_max']:
+                return False
+        
+        return True
+    
+    def build_question_string(self, nums: List[int], operator: str) -> str:
+        """問題文（文字列）の生成"""
+        return format_question(nums, operator)
+    
+    def format_vertical_equation(self, nums: List[int], operator: str) -> str:
+        """問題文生成（横書き形式）"""
+        return self.build_question_string(nums, operator)
+    
+    def generate_problems(self, seed: Optional[int] = None) -> Tuple[pd.DataFrame, pd.DataFrame]:
+        """問題と解答の DataFrame を生成する（seed を指定すると同じ問題を再現できる）"""
+        return self.generate_problem_set(seed).to_frames()
+    
+    def generate_problem_set(self, seed: Optional[int] = None) -> ProblemSet:
+        """問題生成メイン
+
+        seed を省略すると新しいシード値を選ぶ。使ったシード値は問題セットに記録され、
+        同じ設定とシード値からは同じ問題セットが作られる。
+        """
+        if seed is None:
+            seed = new_seed()
+        self.random = random.Random(seed)
+        self.stats = {'candidates': 0, 'accepted': 0, 'coverage_truncated': False}
+        
+        problem_operators = []
+        problems = []  # オペランドの組（昇順に並べるときのキーも兼ねる）
+        answers = []
+        expressions = []  # 演算を混ぜた式の問題文（それ以外は None）
+        # 重複判定は問題文ではなく整数の組で行う（不採用の候補は文字列にしない）
+        used_keys = set()
+        commutative = self.settings['duplicate_mode'] == 2
+        
+        def add_problem(operator: str, nums: List[int], answer: Answer, expression: Optional[str] = None):
+            problem_operators.append(operator)
+            problems.append(nums)
+            answers.append(answer)
+            expressions.append(expression)
+        
+        # 演算子リストの決定
+        operators = self.get_operators()
+        
+        # 網羅モードの処理
+        # 演算子ごとに列挙してから問題数の上限を演算子間で分け合う（先の演算子だけで埋まらないように）
+        coverage_mode = self.settings['generation_mode'] == 2
+        coverage_map = {
+            "+": self.settings['add_coverage'],
+            "-": self.settings['sub_coverage'],
+            "*": self.settings['mul_coverage'],
+            "/": self.settings['div_coverage']
+        }
+        covered = {}
+        for operator in operators:
+            if coverage_mode or coverage_map.get(operator, 1) == 2:
+                # 制約を満たす組み合わせだけを列挙（上限を超えたかどうか分かるよう1つ多く集める）
+                found = []
+                for nums in self.generate_combinations(operator):
+                    if len(found) > self.settings['question_count']:
+                        break
+                    self.stats['candidates'] += 1
+                    answer = self.calculate_answer(nums, operator)
+                    
+                    if self.is_valid_question(answer, operator):
+                        key = canonical_key(operator, nums, commutative)
+                        if key not in used_keys:
+                            used_keys.add(key)
+                            found.append((nums, answer))
+                covered[operator] = found
+        
+        quotas = split_quota({operator: len(found) for operator, found in covered.items()},
+                             self.settings['question_count'])
+        for operator, found in covered.items():
+            for nums, answer in found[:quotas[operator]]:
+                add_problem(operator, nums, answer)
+            for nums, _ in found[quotas[operator]:]:
+                used_keys.discard(canonical_key(operator, nums, commutative))
+        # 上限で打ち切った演算子がある場合は、すべての組み合わせを出せていない
+        self.stats['coverage_truncated'] = any(quotas[operator] < len(found) for operator, found in covered.items())
+        
+        # 抽出モード：条件を満たす組み合わせから重複なしで直接抽出
+        # （組み合わせが多すぎる場合は通常モードの一括生成で重複なしに抽出する）
+        sampling_mode = self.settings['generation_mode'] == 3
+        sampled = self.sample_problems(operators, self.settings['question_count']) if sampling_mode else None
+        if sampled is not None:
+            for operator, nums in sampled:
+                used_keys.add(canonical_key(operator, nums, commutative))
+                add_problem(operator, nums, self.calculate_answer(nums, operator))
+        
+        # 演算を混ぜた式（答えから逆算して組み立てる）
+        inverse_mode = self.settings['generation_mode'] == 4
+        mixed_mode = not coverage_mode and sampled is None and self.uses_mixed_expressions()
+        if mixed_mode:
+            builder = ExpressionBuilder(self.settings, operators, self.random)
+            failures = 0
+            while len(problems) < self.settings['question_count'] and failures < MAX_CONSECUTIVE_FAILURES:
+                node = builder.build()
+                if node is None:
+                    failures += 1
+                    continue
+                expression = format_expression(node)
+                key = ('expression', expression)
+                if key in used_keys:
+                    failures += 1
+                    continue
+                failures = 0
+                used_keys.add(key)
+                add_problem(node[0], leaves(node), Answer(evaluate(node)), expression)
+            self.stats['candidates'] += builder.attempts
+        
+        # 逆算モード：条件を満たす答えを選んでからオペランドを決める（条件で捨てる候補がない）
+        # （途中の値が多すぎて逆算できない設定では、通常モードの一括生成を使う）
+        answer_first = False
+        if inverse_mode and not mixed_mode:
+            builder = AnswerFirstBuilder(self.settings, self.is_valid_question, self.random)
+            answer_first = all(builder.supports(op) for op in operators)
+        if answer_first:
+            usable = [op for op in operators if builder.has_answers(op)]
+            failures = 0
+            while len(problems) < self.settings['question_count'] and usable and failures < MAX_CONSECUTIVE_FAILURES:
+                operator = self.random.choice(usable)
+                nums = builder.build(operator)
+                key = canonical_key(operator, nums, commutative)
+                if key in used_keys:
+                    failures += 1
+                    continue
+                failures = 0
+                used_keys.add(key)
+                add_problem(operator, nums, self.calculate_answer(nums, operator))
+            self.stats['candidates'] += builder.attempts
+            
+            # 重複ばかりになった（作れる問題がほぼ出尽くした）場合は、残りを全組み合わせから補う
+            # （組み合わせが多すぎる場合は補わない）
+            if failures >= MAX_CONSECUTIVE_FAILURES:
+                try:
+                    rest = [(operator, nums) for operator, nums in self.feasible_problems(usable, ENUMERATION_LIMIT)
+                            if canonical_key(operator, nums, commutative) not in used_keys]
+                except EnumerationLimitExceeded:
+                    rest = []
+                count = min(len(rest), self.settings['question_count'] - len(problems))
+                for operator, nums in self.random.sample(rest, count):
+                    used_keys.add(canonical_key(operator, nums, commutative))
+                    add_problem(operator, nums, self.calculate_answer(nums, operator))
+        
+        # 通常生成モード（網羅・抽出・逆算モードでは不要）
+        if not coverage_mode and sampled is None and not answer_first and not mixed_mode:
+            remaining = self.settings['question_count'] - len(problems)
+            batch = BatchGenerator(self.settings, np.random.default_rng(seed))
+            candidates = batch.iter_candidates(
+                operators,
+                batch_size=max(BATCH_SIZE, remaining * 4),
+                max_candidates=MAX_CANDIDATES
+            )
+            
+            # 必要な数がそろったら次の候補は取り出さない（調べた候補数を正しく数えるため）
+            for operator, nums in (candidates if remaining > 0 else []):
+                key = canonical_key(operator, nums, commutative)
+                if key not in used_keys:
+                    used_keys.add(key)
+                    add_problem(operator, nums, self.calculate_answer(nums, operator))
+                if len(problems) >= self.settings['question_count']:
+                    break
+            self.stats['candidates'] += batch.candidates_tried
+        
+        self.stats['accepted'] = len(problems)
+        
+        # 順序設定の適用（問題と解答は同じ順に並べる）
+        order = list(range(len(problems)))
+        if self.settings['randomize_order']:
+            # ランダム順序
+            self.random.shuffle(order)
+        else:
+            # 昇順（オペランドの数値順）
+            order.sort(key=lambda i: problems[i])
+        
+        problem_set = ProblemSet.from_rows(seed, problem_operators, problems, answers, self.settings['term_count'],
+                                           expressions)
+        return problem_set.take(order)
+    
+    def uses_mixed_expressions(self) -> bool:
+        """1問に複数の演算を混ぜた式を作るかどうか（混合問題・3項以上・通常モードか逆算モード）"""
+        return (self.settings['problem_type'] in MIXED_PROBLEM_TYPES
+                and self.settings['mixed_operators'] == 2
+                and self.settings['term_count'] >= 3
+                and self.settings['generation_mode'] in (1, 4))
+    
+    def get_operators(self) -> List[str]:
+        """問題形式に対応する演算子リスト"""
+        return OPERATOR_MAP.get(self.settings['problem_type'], ["+"])
+    
+    def generate_combinations(self, operator: str) -> Iterator[List[int]]:
+        """組み合わせ生成（制約で枝刈りした全組み合わせ）"""
+        return EnumerationEngine(self.settings).enumerate(operator)
+    
+    def feasible_problems(self, operators: List[str], limit: Optional[int] = None) -> Iterator[Tuple[str, List[int]]]:
+        """現在の設定で作れる問題 (演算子, オペランド) をすべて列挙
+
+        数の順番の入れかえも重複とみなす設定では、最初に現れた並びだけを返す。
+        limit を指定すると、調べた組み合わせが limit を超えた時点で EnumerationLimitExceeded を送出する。
+        """
+        commutative = self.settings['duplicate_mode'] == 2
+        seen = set()
+        examined = 0
+        for operator in operators:
+            for nums in self.generate_combinations(operator):
+                examined += 1
+                if limit is not None and examined > limit:
+                    raise EnumerationLimitExceeded(limit)
+                self.stats['candidates'] += 1
+                if not self.is_valid_question(self.calculate_answer(nums, operator), operator):
+                    continue
+                if commutative:
+                    key = canonical_key(operator, nums, commutative)
+                    if key in seen:
+                        continue
+                    seen.add(key)
+                yield operator, nums
+    
+    def feasibility_settings(self) -> Dict[str, Any]:
+        """作れる問題の数を左右する設定だけを取り出す（数えた結果のキャッシュのキー用）"""
+        keys = list(FEASIBILITY_KEYS)
+        for prefix in RANGE_PREFIX.values():
+            for number in range(1, 6):
+                keys += [f'{prefix}_min{number}', f'{prefix}_max{number}']
+        return {key: self.settings[key] for key in keys if key in self.settings}
+    
+    def count_feasible_problems(self, limit: int = ENUMERATION_LIMIT) -> Tuple[int, bool]:
+        """現在の設定で作れる問題の数
+
+        (数, 全部数えたか) を返す。調べる組み合わせが limit を超えた場合は、
+        それまでに見つかった数（実際の総数の下限）と False を返す。
+        """
+        count = 0
+        try:
+            for _ in self.feasible_problems(self.get_operators(), limit):
+                count += 1
+        except EnumerationLimitExceeded:
+            return count, False
+        return count, True
+    
+    def sample_problems(self, operators: List[str], count: int,
+                        limit: int = ENUMERATION_LIMIT) -> Optional[List[Tuple[str, List[int]]]]:
+        """作れる問題の中から count 問を重複なしで抽出
+
+        調べる組み合わせが limit を超える場合は列挙をやめて None を返す（一括生成で抽出する）。
+        """
+        try:
+            problems = list(self.feasible_problems(operators, limit))
+        except EnumerationLimitExceeded:
+            return None
+        return self.random.sample(problems, min(count, len(problems)))
+    
+    @property
+    def settings(self) -> Dict[str, Any]:
+        return self._settings
@@ -0,0 +1,117 @@
+from fractions import Fraction
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from answer import Answer
+from batch_generator import OPERATORS, OPERATOR_CODES
+from seed_id import format_seed_id, parse_seed_id
+
+# 問題文で使う演算子の記号
+DISPLAY_SYMBOLS = {"+": "+", "-": "-", "*": "×", "/": "÷"}
+
+def worksheet_id(seed: int) -> str:
+    """シード値から印刷用のワークシートIDを作る"""
+    return format_seed_id(seed)
+
+
+def parse_worksheet_id(text: str) -> int:
+    """ワークシートIDをシード値に戻す（形式が正しくなければ ValueError）"""
+    return parse_seed_id(text, "ワークシートID")
+
+
+def format_question(nums: Sequence[int], operator: str) -> str:
+    """問題文（文字列）の生成"""
+    return f" {DISPLAY_SYMBOLS[operator]} ".join(str(num) for num in nums)
+
+
+class ProblemSet:
+    """生成した問題をまとめて保持する軽量なコンテナ
+
+    演算子コード・オペランド・答えを並列の配列で持ち、問題文は必要になったときに作る。
+    表示やPDF作成で DataFrame が必要な場合だけ to_frames() で作成する。
+    seed は生成に使ったシード値で、同じ設定とシード値から同じ問題セットを再作成できる。
+
+    演算子を混ぜた式（四則混合）は1つの演算子とオペランドでは表せないため、
+    expressions に問題文を持つ（その問題の operator_codes は最後に計算する演算子、
+    operands は式に現れる数）。
+    """
+
+    __slots__ = ("seed", "operator_codes", "operands", "numerators", "denominators", "remainders",
+                 "expressions")
+
+    def __init__(self, seed: int, operator_codes: np.ndarray, operands: np.ndarray,
+                 numerators: np.ndarray, denominators: np.ndarray, remainders: np.ndarray,
+                 expressions: Optional[List[Optional[str]]] = None):
+        self.seed = seed
+        self.operator_codes = operator_codes
+        self.operands = operands
+        self.numerators = numerators
+        self.denominators = denominators
+        self.remainders = remainders
+        self.expressions = expressions
+
+    @classmethod
+    def from_rows(cls, seed: int, operators: List[str], operands: List[List[int]], answers: List[Answer],
+                  term_count: int, expressions: Optional[List[Optional[str]]] = None) -> "ProblemSet":
+        """1問ずつのリストから作成する"""
+        return cls(
+            seed,
+            np.array([OPERATOR_CODES[op] for op in operators], dtype=np.int8),
+            np.array(operands, dtype=np.int64).reshape(len(operands), term_count),
+            np.array([a.value.numerator for a in answers], dtype=np.int64),
+            np.array([a.value.denominator for a in answers], dtype=np.int64),
+            np.array([a.remainder for a in answers], dtype=np.int64),
+            expressions if expressions is not None and any(e is not None for e in expressions) else None,
+        )
+
+    def __len__(self) -> int:
+        return len(self.operator_codes)
+
+    def take(self, order: Sequence[int]) -> "ProblemSet":
+        """指定した順に並べ替えた問題セット"""
+        order = np.asarray(order, dtype=np.int64)
+        expressions = None if self.expressions is None else [self.expressions[i] for i in order.tolist()]
+        return ProblemSet(self.seed, self.operator_codes[order], self.operands[order], self.numerators[order],
+                          self.denominators[order], self.remainders[order], expressions)
+
+    @property
+    def worksheet_id(self) -> str:
+        return worksheet_id(self.seed)
+
+    def operator(self, index: int) -> str:
+        return OPERATORS[self.operator_codes[index]]
+
+    def question(self, index: int) -> str:
+        if self.expressions is not None and self.expressions[index] is not None:
+            return self.expressions[index]
+        return format_question(self.operands[index].tolist(), self.operator(index))
+
+    def answer(self, index: int) -> Answer:
+        value = Fraction(int(self.numerators[index]), int(self.denominators[index]))
+        return Answer(value, int(self.remainders[index]))
+
+    def questions(self) -> List[str]:
+        return [self.question(i) for i in range(len(self))]
+
+    def answer_texts(self) -> List[str]:
+        return [str(self.answer(i)) for i in range(len(self))]
+
+    def to_frames(self) -> Tuple[pd.DataFrame, pd.DataFrame]:
+        """問題と解答の DataFrame を作成する"""
+        if len(self) == 0:
+            return pd.DataFrame(), pd.DataFrame()
+        numbers = np.arange(1, len(self) + 1)
+        answer_texts = self.answer_texts()
+        problems_df = pd.DataFrame({
+            'ばんごう': numbers,
+            'もんだい': self.questions(),
+            'こたえ': '',  # 生徒が記入する答え欄
+            'せいかい': answer_texts,
+        })
+        answers_df = pd.DataFrame({
+            'もんだいばんごう': numbers,
+            'せいかい': answer_texts,
+        })
+        return problems_df, answers_df
@@ -22,9 +22,10 @@ def show_usage_guide():
     
     #### 🎯 メインページ（サイドバー）
     - **問題形式**: 足し算・引き算・かけ算・わり算から選択
-    - **問題数**: 10問ずつ増加（10問～100問）
+    - **問題数**: 10問ずつ増加（10問～500問）
     - **項数**: 2項～5項のドロップダウンで選択
-    - **生成方法**: 通常モードまたは網羅モード
+    - **混合のしかた**: 足し引き混合・四則混合で3項以上のとき、1問に複数の演算を混ぜた式（例：3 + 4 × 2）を作成（かっこの有無も選択可）
+    - **生成方法**: 通常モード・網羅モード・抽出モード（条件を満たす問題から重複なしで指定数を抽出）・逆算モード（答えを先に決めてから式を作る）
     - **順序設定**: 昇順またはランダム
     
     #### ⚙️ 詳細設定ページ
@@ -42,4 +43,5 @@ def show_usage_guide():
     1. 問題生成後、ブラウザの印刷機能（Ctrl+P）を使用
     2. 印刷設定で「背景のグラフィック」を有効にすると見やすくなります
     3. 解答欄表示の設定に応じて、解答の表示方法が変わります
+    4. PDFの日付の下に印字される**ワークシートID**を「ワークシートID」欄に入力して問題生成すると、同じ設定で同じ問題を再作成できます
     """) 
\ No newline at end of file
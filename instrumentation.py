@@ -0,0 +1,145 @@
+# streamlit-app/instrumentation.py
+"""再実行（rerun）ごとの処理時間の計測
+
+app.py から enable() を呼んだときだけ有効になる。無効の間は phase() は何もしない。
+
+    with phase("generation"):
+        problems_df, answers_df = generator.generate_problems()
+
+1回の再実行で計測したフェーズの時間と st.rerun() の呼び出し回数を、
+JSON形式のログ（python-json-logger）と任意のデバッグパネルに出力する。
+"""
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List
+
+import streamlit as st
+
+try:
+    from pythonjsonlogger.json import JsonFormatter
+except ImportError:  # python-json-logger 2.x
+    from pythonjsonlogger.jsonlogger import JsonFormatter
+
+LOGGER_NAME = "learn_apps.instrumentation"
+HISTORY_SIZE = 20  # デバッグパネルに残す再実行の数
+
+_SESSION_KEY = "_instrumentation"
+
+logger = logging.getLogger(LOGGER_NAME)
+
+_enabled = False
+_show_panel = False
+_current = threading.local()  # Streamlitはセッションごとに別スレッドで再実行する
+
+
+def enable(show_panel: bool = False):
+    """計測を有効にする（プロセス内で一度だけ設定される）"""
+    global _enabled, _show_panel
+    _show_panel = show_panel
+    if _enabled:
+        return
+    _enabled = True
+
+    if not logger.handlers:
+        handler = logging.StreamHandler()
+        handler.setFormatter(JsonFormatter("%(asctime)s %(name)s %(message)s"))
+        logger.addHandler(handler)
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+
+    # st.rerun() の呼び出し回数を数える
+    original_rerun = st.rerun
+
+    def counted_rerun(*args, **kwargs):
+        record = getattr(_current, "record", None)
+        if record is not None:
+            record['st_rerun_calls'] += 1
+        _session_state()['pending_rerun'] = True
+        return original_rerun(*args, **kwargs)
+
+    st.rerun = counted_rerun
+
+
+def is_enabled() -> bool:
+    return _enabled
+
+
+@contextmanager
+def phase(name: str) -> Iterator[None]:
+    """名前付きのフェーズの処理時間を計測する"""
+    record = getattr(_current, "record", None) if _enabled else None
+    if record is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        record['phases'][name] = record['phases'].get(name, 0.0) + elapsed_ms
+
+
+@contextmanager
+def rerun_scope(page: str) -> Iterator[None]:
+    """1回の再実行全体を囲み、終了時にログとデバッグパネルへ出力する
+
+    st.rerun() や st.stop() による例外で中断された場合もログは出力する。
+    """
+    if not _enabled:
+        yield
+        return
+
+    state = _session_state()
+    record = {
+        'page': page,
+        'trigger': "st.rerun" if state.pop('pending_rerun', False) else "user",
+        'phases': {},
+        'st_rerun_calls': 0,
+    }
+    _current.record = record
+    start = time.perf_counter()
+    completed = False
+    try:
+        yield
+        completed = True
+    finally:
+        _current.record = None
+        record['total_ms'] = round((time.perf_counter() - start) * 1000, 3)
+        record['phases'] = {name: round(ms, 3) for name, ms in record['phases'].items()}
+        state['reruns'] = state.get('reruns', 0) + record['st_rerun_calls']
+        history: List[Dict[str, Any]] = state.setdefault('history', [])
+        history.append(record)
+        del history[:-HISTORY_SIZE]
+        logger.info("rerun", extra=record)
+
+        # 例外で中断された再実行では画面を描画できないため、次の再実行で表示される
+        if completed and _show_panel:
+            render_debug_panel()
+
+
+def render_debug_panel():
+    """直近の再実行の計測結果をサイドバーに表示する"""
+    state = _session_state()
+    history = state.get('history', [])
+    with st.sidebar.expander("⏱️ 計測（デバッグ）", expanded=False):
+        st.caption(f"st.rerun() の呼び出し: {state.get('reruns', 0)} 回")
+        if not history:
+            st.caption("計測結果はまだありません")
+            return
+        rows = [
+            {
+                'ページ': record['page'],
+                'きっかけ': record['trigger'],
+                '合計(ms)': record['total_ms'],
+                **{f"{name}(ms)": ms for name, ms in record['phases'].items()},
+            }
+            for record in reversed(history)
+        ]
+        st.dataframe(rows, hide_index=True, use_container_width=True)
+
+
+def _session_state() -> Dict[str, Any]:
+    """計測用のセッション状態"""
+    return st.session_state.setdefault(_SESSION_KEY, {})
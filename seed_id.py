@@ -0,0 +1,34 @@
+# streamlit-app/seed_id.py
+"""共有用ID（シード値を16進数8桁で表したもの）
+
+算数ドリルのワークシートIDと国旗クイズのクイズIDで共通に使う。
+同じ設定とシード値から同じ問題を作れるため、IDを控えておけば再作成・共有できる。
+"""
+import re
+import secrets
+
+# シード値は32ビット（IDは16進数8桁）
+SEED_BITS = 32
+ID_LENGTH = SEED_BITS // 4
+
+
+def new_seed() -> int:
+    """新しいシード値"""
+    return secrets.randbits(SEED_BITS)
+
+
+def format_seed_id(seed: int) -> str:
+    """シード値からIDを作る"""
+    return f"{seed:0{ID_LENGTH}X}"
+
+
+def parse_seed_id(text: str, label: str = "ID") -> int:
+    """IDをシード値に戻す
+
+    前後の空白を除いて16進数ちょうど8桁でなければ、label を使った日本語の ValueError を送出する
+    （符号・0x・区切りの _ などは受け付けない）。
+    """
+    text = text.strip()
+    if not re.fullmatch(f"[0-9A-Fa-f]{{{ID_LENGTH}}}", text):
+        raise ValueError(f"{label}は16進数{ID_LENGTH}桁です: {text}")
+    return int(text, 16)